@@ -1,7 +1,10 @@
 #!/usr/bin/python3
 """ Console Module """
+import argparse
 import cmd
 from datetime import datetime
+from itertools import islice
+import json
 import re
 import os
 import sys
@@ -35,10 +38,26 @@ class HBNBCommand(cmd.Cmd):
              'latitude': float, 'longitude': float
             }
 
+    write_cmds = ['create', 'destroy', 'update']
+
+    def __init__(self, *args, batch_size=0, **kwargs):
+        """Initializes the console
+
+        Args:
+            batch_size (int): The number of create, destroy and update
+            commands whose changes are saved together, or 0 to save the
+            changes of every command as it runs.
+        """
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+        self.batched = 0
+
     def preloop(self):
         """Prints if isatty is false"""
         if not sys.__stdin__.isatty():
             print('(hbnb)')
+        if self.batch_size > 0:
+            storage.begin()
 
     def precmd(self, line):
         """Reformat command line for advanced command syntax.
@@ -93,12 +112,20 @@ class HBNBCommand(cmd.Cmd):
 
     def postcmd(self, stop, line):
         """Prints if isatty is false"""
+        if self.batch_size > 0 and line.partition(' ')[0] in \
+                HBNBCommand.write_cmds:
+            self.batched += 1
+            if self.batched >= self.batch_size:
+                storage.commit()
+                storage.begin()
+                self.batched = 0
         if not sys.__stdin__.isatty():
             print('(hbnb) ', end='')
         return stop
 
     def do_quit(self, command):
         """ Method to exit the HBNB console"""
+        storage.commit()
         exit(0)
 
     def help_quit(self):
@@ -107,12 +134,34 @@ class HBNBCommand(cmd.Cmd):
 
     def do_EOF(self, arg):
         """ Handles EOF to exit program """
+        storage.commit()
         exit(0)
 
     def help_EOF(self):
         """ Prints the help documentation for EOF """
         print("Exits the program without formatting\n")
 
+    def do_begin(self, args):
+        """ Defers saving changes until the commit command """
+        storage.begin()
+
+    def help_begin(self):
+        """ Help information for the begin command """
+        print("Defers saving the changes of the following commands")
+        print("[Usage]: begin\n")
+
+    def do_commit(self, args):
+        """ Saves the changes made since the begin command """
+        storage.commit()
+        self.batched = 0
+        if self.batch_size > 0:
+            storage.begin()
+
+    def help_commit(self):
+        """ Help information for the commit command """
+        print("Saves the changes made since the begin command")
+        print("[Usage]: commit\n")
+
     def emptyline(self):
         """ Overrides the emptyline method of CMD """
         return False
@@ -203,11 +252,11 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = c_name + "." + c_id
-        try:
-            print(storage.all()[key])
-        except KeyError:
+        obj = storage.get(HBNBCommand.classes[c_name], c_id)
+        if obj is None:
             print("** no instance found **")
+        else:
+            print(obj)
 
     def help_show(self):
         """ Help information for the show command """
@@ -234,13 +283,13 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = c_name + "." + c_id
-
-        try:
-            storage.delete(storage.all()[key])
-            storage.save()
-        except KeyError:
+        obj = storage.get(HBNBCommand.classes[c_name], c_id)
+        if obj is None:
             print("** no instance found **")
+            return
+
+        storage.delete(obj)
+        storage.save()
 
     def help_destroy(self):
         """ Help information for the destroy command """
@@ -249,33 +298,59 @@ class HBNBCommand(cmd.Cmd):
 
     def do_all(self, args):
         """ Shows all objects, or all objects of a class"""
-        print_list = []
-
-        if args:
-            args = args.split(' ')[0]  # remove possible trailing args
-            if args not in HBNBCommand.classes:
-                print("** class doesn't exist **")
-                return
-            for k, v in storage.all().items():
-                if k.split('.')[0] == args:
-                    print_list.append(str(v))
-        else:
-            for k, v in storage.all().items():
-                print_list.append(str(v))
+        c_name = ''
+        options = {}
+        for i, arg in enumerate(args.split()):
+            key, sep, value = arg.partition('=')
+            if sep:
+                options[key] = value
+            elif i == 0:
+                c_name = arg
+
+        if c_name and c_name not in HBNBCommand.classes:
+            print("** class doesn't exist **")
+            return
+        try:
+            out_format = options.pop('format', 'list')
+            offset = int(options.pop('offset', 0))
+            limit = options.pop('limit', None)
+            stop = None if limit is None else offset + int(limit)
+            if options or out_format not in ('list', 'ndjson') or \
+                    offset < 0 or (stop is not None and stop < offset):
+                raise ValueError
+        except ValueError:
+            print("** invalid option **")
+            return
 
-        print(print_list)
+        # write each object as it comes instead of building the whole list
+        objs = storage.iter(HBNBCommand.classes.get(c_name))
+        objs = islice(objs, offset, stop)
+        if out_format == 'ndjson':
+            for i, v in enumerate(objs):
+                sys.stdout.write(json.dumps(v.to_dict(False)) + '\n')
+                if i == 0:
+                    sys.stdout.flush()
+            return
+        sys.stdout.write('[')
+        for i, v in enumerate(objs):
+            if i > 0:
+                sys.stdout.write(', ')
+            sys.stdout.write(repr(v.to_str(False)))
+            if i == 0:
+                sys.stdout.flush()
+        sys.stdout.write(']\n')
 
     def help_all(self):
         """ Help information for the all command """
         print("Shows all objects, or all of a class")
-        print("[Usage]: all <className>\n")
+        print("[Usage]: all <className> [format=list|ndjson] "
+              "[offset=<n>] [limit=<n>]\n")
 
     def do_count(self, args):
         """Count current number of class instances"""
         count = 0
-        for k, v in storage.all().items():
-            if args == k.split('.')[0]:
-                count += 1
+        if args in HBNBCommand.classes:
+            count = storage.count(HBNBCommand.classes[args])
         print(count)
 
     def help_count(self):
@@ -305,11 +380,11 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        # generate key from class and id
-        key = c_name + "." + c_id
+        # retrieve the object with the class and id
+        obj = storage.get(HBNBCommand.classes[c_name], c_id)
 
-        # determine if key is present
-        if key not in storage.all():
+        # determine if object is present
+        if obj is None:
             print("** no instance found **")
             return
 
@@ -342,9 +417,6 @@ class HBNBCommand(cmd.Cmd):
 
             args = [att_name, att_val]
 
-        # retrieve dictionary of current objects
-        new_dict = storage.all()[key]
-
         # iterate through attr names and values
         for i, att_name in enumerate(args):
             # block only runs on even iterations
@@ -360,10 +432,10 @@ class HBNBCommand(cmd.Cmd):
                 if att_name in HBNBCommand.types:
                     att_val = HBNBCommand.types[att_name](att_val)
 
-                # update dictionary with name, value pair
-                new_dict.__dict__.update({att_name: att_val})
+                # update attribute with name, value pair
+                setattr(obj, att_name, att_val)
 
-        new_dict.save()  # save updates to file
+        obj.save()  # save updates to file
 
     def help_update(self):
         """ Help information for the update class """
@@ -372,4 +444,10 @@ class HBNBCommand(cmd.Cmd):
 
 
 if __name__ == "__main__":
-    HBNBCommand().cmdloop()
+    parser = argparse.ArgumentParser(description='The HBNB console.')
+    parser.add_argument(
+        '--batch', type=int, default=0, metavar='N',
+        help='save the changes of every N create/destroy/update commands'
+        ' together instead of after each one'
+    )
+    HBNBCommand(batch_size=parser.parse_args().batch).cmdloop()
@@ -2,11 +2,12 @@
 """This module instantiates an object of class FileStorage"""
 import os
 
-from models.engine.db_storage import DBStorage
-from models.engine.file_storage import FileStorage
-
-storage = DBStorage() if os.getenv(
-    'HBNB_TYPE_STORAGE') == 'db' else FileStorage()
+if os.getenv('HBNB_TYPE_STORAGE') == 'db':
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage()
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
 """A unique FileStorage/DBStorage instance for all models.
+It loads its data or connects to the database when it is first used.
 """
-storage.reload()
@@ -2,19 +2,61 @@
 """This module defines a base class for all models in our hbnb clone"""
 import os
 import uuid
+import weakref
 from datetime import datetime
-from sqlalchemy import Column, String, DATETIME
-from sqlalchemy.ext.declarative import declarative_base
 
 
-Base = declarative_base()
+if os.getenv('HBNB_TYPE_STORAGE') == 'db':
+    from sqlalchemy import Column, String, DATETIME
+    from sqlalchemy.ext.declarative import declarative_base
+
+    Base = declarative_base()
+else:
+    class Base:
+        """The base class of the models in file storage mode.
+        It isn't mapped by SQLAlchemy, so model instances don't carry
+        the instrumentation state only the database storage needs, and
+        SQLAlchemy isn't imported at all.
+        """
+
+
+_changes = weakref.WeakKeyDictionary()
+"""The names of the attributes set on each model since it was last
+written to the file storage.
+"""
+_cache = weakref.WeakKeyDictionary()
+"""The dictionary and string representations of each model in file
+storage mode, kept until one of its attributes is set.
+"""
+_caching = os.getenv('HBNB_TYPE_STORAGE') != 'db'
 
 
 class BaseModel:
     """A base class for all hbnb models"""
-    id = Column(String(60), nullable=False, primary_key=True, unique=True)
-    created_at = Column(DATETIME, nullable=False, default=datetime.utcnow())
-    updated_at = Column(DATETIME, nullable=False, default=datetime.utcnow())
+    if os.getenv('HBNB_TYPE_STORAGE') == 'db':
+        id = Column(
+            String(60), nullable=False, primary_key=True, unique=True)
+        created_at = Column(
+            DATETIME, nullable=False, default=datetime.utcnow())
+        updated_at = Column(
+            DATETIME, nullable=False, default=datetime.utcnow())
+    else:
+        # SQLAlchemy tracks the changes of the models it maps
+        def __setattr__(self, name, value):
+            """Sets an attribute and records that the model changed"""
+            object.__setattr__(self, name, value)
+            _cache.pop(self, None)
+            names = _changes.get(self)
+            if names is None:
+                _changes[self] = {name}
+            else:
+                names.add(name)
+
+        def __delattr__(self, name):
+            """Deletes an attribute and records that the model changed"""
+            object.__delattr__(self, name)
+            _cache.pop(self, None)
+            _changes.setdefault(self, set()).add(name)
 
     def __init__(self, *args, **kwargs):
         """Instantiates a new model"""
@@ -29,18 +71,69 @@ class BaseModel:
                         setattr(self, key, datetime.fromisoformat(value))
                     else:
                         setattr(self, key, value)
-            # if os.getenv('HBNB_TYPE_STORAGE') in ('db'):
-            if not hasattr(kwargs, 'id'):
+            if 'id' not in kwargs:
                 setattr(self, 'id', str(uuid.uuid4()))
-            if not hasattr(kwargs, 'created_at'):
+            if 'created_at' not in kwargs:
                 setattr(self, 'created_at', datetime.now())
-            if not hasattr(kwargs, 'updated_at'):
+            if 'updated_at' not in kwargs:
                 setattr(self, 'updated_at', datetime.now())
 
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a model from the output of its to_dict() method.
+        The stored id and timestamps are kept and, for models that
+        aren't mapped by SQLAlchemy, __init__ is skipped altogether.
+
+        Args:
+            data (dict): The model's dictionary representation.
+        """
+        if hasattr(cls, '__table__'):
+            return cls(**data)
+        obj = cls.__new__(cls)
+        for key, value in data.items():
+            if key in ('created_at', 'updated_at'):
+                value = datetime.fromisoformat(value)
+            elif key == '__class__':
+                continue
+            # as stored, so not a change
+            object.__setattr__(obj, key, value)
+        return obj
+
+    def changes(self):
+        """Returns the names of the attributes set since the model was
+        last written to the file storage.
+        """
+        return frozenset(_changes.get(self, ()))
+
+    def mark_stored(self):
+        """Records that the model was written to the file storage"""
+        _changes.pop(self, None)
+
+    @classmethod
+    def changed(cls):
+        """Returns the models of this class with unstored changes"""
+        return [obj for obj in list(_changes.keys()) if isinstance(obj, cls)]
+
     def __str__(self):
         """Returns a string representation of the instance"""
-        cls = (str(type(self)).split('.')[-1]).split('\'')[0]
-        return '[{}] ({}) {}'.format(cls, self.id, self.__dict__)
+        return self.to_str()
+
+    def to_str(self, cache=True):
+        """Returns a string representation of the instance
+
+        Args:
+            cache (bool): Whether to keep the result for the next calls
+            until an attribute is set. Callers going through every
+            stored model once pass False to save memory.
+        """
+        cached = _cache.get(self)
+        if cached is not None and 'str' in cached:
+            return cached['str']
+        res = '[{}] ({}) {}'.format(
+            type(self).__name__, self.id, self.__dict__)
+        if cache and _caching:
+            _cache.setdefault(self, {})['str'] = res
+        return res
 
     def delete(self):
         """Deletes this BaseModel instance from the storage"""
@@ -54,8 +147,17 @@ class BaseModel:
         storage.new(self)
         storage.save()
 
-    def to_dict(self):
-        """Convert instance into dict format"""
+    def to_dict(self, cache=True):
+        """Convert instance into dict format
+
+        Args:
+            cache (bool): Whether to keep the result for the next calls
+            until an attribute is set. Callers going through every
+            stored model once pass False to save memory.
+        """
+        cached = _cache.get(self)
+        if cached is not None and 'dict' in cached:
+            return dict(cached['dict'])
         res = {}
         for key, value in self.__dict__.items():
             if key != '_sa_instance_state':
@@ -64,4 +166,6 @@ class BaseModel:
                 else:
                     res[key] = value
         res['__class__'] = self.__class__.__name__
+        if cache and _caching:
+            _cache.setdefault(self, {})['dict'] = dict(res)
         return res
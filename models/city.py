@@ -1,11 +1,13 @@
 #!/usr/bin/python3
 """ City Module for HBNB project """
 import os
-from sqlalchemy import Column, String, ForeignKey
-from sqlalchemy.orm import relationship
 
 from models.base_model import BaseModel, Base
 
+if os.getenv('HBNB_TYPE_STORAGE') == 'db':
+    from sqlalchemy import Column, String, ForeignKey
+    from sqlalchemy.orm import relationship
+
 
 class City(BaseModel, Base):
     """ The city class, contains state ID and name """
@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+"""This module defines the binary snapshot format of the file storage.
+
+A snapshot starts with a header holding a magic number and the offset of
+its directory. It is followed by one segment per model class, made of a
+JSON array of the class' records and an offset table mapping each id to
+the position of its record in the file. The directory, a JSON object at
+the end of the file, maps each class name to its segment.
+"""
+import json
+import mmap
+import struct
+
+
+MAGIC = b'HBNB\x01'
+"""The bytes that start a binary snapshot file.
+"""
+HEADER = struct.Struct('<5sQ')
+"""The layout of the header: the magic number and the directory offset.
+"""
+
+
+def write_snapshot(file, objects):
+    """Writes a binary snapshot of the given models.
+
+    Args:
+        file (file): The snapshot file, open for writing in binary mode.
+        objects (dict): The models to write, keyed by <class name>.<id>.
+    """
+    by_class = {}
+    for key, obj in objects.items():
+        by_class.setdefault(key.partition('.')[0], []).append(obj)
+    directory = {}
+    file.write(HEADER.pack(MAGIC, 0))
+    for cls_name, objs in by_class.items():
+        start = file.tell()
+        offsets = {}
+        file.write(b'[')
+        for i, obj in enumerate(objs):
+            if i > 0:
+                file.write(b',')
+            record = json.dumps(
+                obj.to_dict(False), separators=(',', ':')).encode()
+            offsets[obj.id] = [file.tell(), len(record)]
+            file.write(record)
+        file.write(b']')
+        index_start = file.tell()
+        file.write(json.dumps(offsets, separators=(',', ':')).encode())
+        directory[cls_name] = {
+            'records': [start, index_start - start],
+            'index': [index_start, file.tell() - index_start],
+            'count': len(objs)
+        }
+    directory_start = file.tell()
+    file.write(json.dumps(directory).encode())
+    file.seek(0)
+    file.write(HEADER.pack(MAGIC, directory_start))
+
+
+class BinarySnapshot:
+    """Reads the segments of a binary snapshot file on demand"""
+
+    def __init__(self, path):
+        """Opens a binary snapshot file and reads its directory
+
+        Args:
+            path (str): The path of the snapshot file.
+        """
+        self.__file = open(path, 'rb')
+        self.__map = None
+        try:
+            self.__map = mmap.mmap(
+                self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, directory_start = HEADER.unpack_from(self.__map)
+            if magic != MAGIC:
+                raise ValueError('{} is not a binary snapshot'.format(path))
+            self.__directory = json.loads(self.__map[directory_start:])
+        except Exception as ex:
+            self.close()
+            raise ValueError(str(ex))
+        self.__offsets = {}
+
+    def classes(self):
+        """Returns the names of the classes stored in the snapshot"""
+        return list(self.__directory.keys())
+
+    def count(self, cls_name):
+        """Returns the number of records of a class in the snapshot"""
+        return self.__directory.get(cls_name, {}).get('count', 0)
+
+    def load(self, cls_name):
+        """Returns the records of all the models of a class"""
+        if cls_name not in self.__directory:
+            return []
+        start, length = self.__directory[cls_name]['records']
+        return json.loads(self.__map[start:start + length])
+
+    def load_one(self, cls_name, id):
+        """Returns the record of the model of a class with an id or None"""
+        if cls_name not in self.__directory:
+            return None
+        if cls_name not in self.__offsets:
+            start, length = self.__directory[cls_name]['index']
+            self.__offsets[cls_name] = json.loads(
+                self.__map[start:start + length])
+        entry = self.__offsets[cls_name].get(id)
+        if entry is None:
+            return None
+        return json.loads(self.__map[entry[0]:entry[0] + entry[1]])
+
+    def close(self):
+        """Releases the snapshot file"""
+        if self.__map is not None:
+            self.__map.close()
+            self.__map = None
+        self.__file.close()
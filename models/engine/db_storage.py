@@ -1,7 +1,10 @@
 #!/usr/bin/python3
 """This module defines a class to manage database storage for hbnb clone"""
 import os
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import create_engine, func, or_, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.orm import sessionmaker, scoped_session
 import urllib.parse
 
@@ -18,9 +21,18 @@ class DBStorage:
     """This class manages storage of hbnb models in a SQL database"""
     __engine = None
     __session = None
+    __classes = (User, State, City, Amenity, Place, Review)
+    __batching = False
+    __generation = 0
+    __deleted_at = None
 
     def __init__(self):
-        """Initializes the SQL database storage"""
+        """Initializes the SQL database storage.
+        The database is connected to when the storage is first used.
+        """
+
+    def __connect(self):
+        """Creates the engine of the SQL database"""
         user = os.getenv('HBNB_MYSQL_USER')
         pword = os.getenv('HBNB_MYSQL_PWD')
         host = os.getenv('HBNB_MYSQL_HOST')
@@ -36,34 +48,216 @@ class DBStorage:
         if env == 'test':
             Base.metadata.drop_all(self.__engine)
 
-    def all(self, cls=None):
-        """Returns a dictionary of models currently in storage"""
+    @property
+    def generation(self):
+        """A number that changes whenever this process changes the
+        models in storage.
+        """
+        return self.__generation
+
+    @property
+    def fingerprint(self):
+        """A string that changes whenever the models in storage change.
+        The number of models changes with the deletes that leave the
+        latest update time alone.
+        """
+        return repr((self.last_modified, self.count()))
+
+    @property
+    def last_modified(self):
+        """The latest time a model was updated, or deleted by this
+        process, or None. The deletes made by other processes are not
+        seen, so it is not enough to tell whether the models changed.
+        """
+        self.__load()
+        latest = self.__deleted_at
+        for class_type in self.__classes:
+            value = self.__session.query(
+                func.max(class_type.updated_at)).scalar()
+            if value is not None and (latest is None or value > latest):
+                latest = value
+        return latest
+
+    def __load(self):
+        """Opens the session the first time the storage is used"""
+        if self.__session is None:
+            self.reload()
+
+    def all(self, cls=None, load=(), limit=None, after=None, order_by=None):
+        """Returns a dictionary of models currently in storage
+
+        Args:
+            cls (type): The class of the models to return.
+            load (iterable): The relationships of cls to load together with
+            its models, as relationship names or SQLAlchemy loader options.
+            Collections are loaded with one extra SELECT per relationship
+            and single objects are joined into the main SELECT.
+            limit (int): The maximum number of models to return.
+            after (str): The id of the model the returned ones follow,
+            usually the last one of the previous page.
+            order_by (str): The attribute the models are sorted by, with
+            their id breaking ties. The models are sorted by id when
+            limit or after is given without it.
+        """
+        self.__load()
         objects = dict()
-        all_classes = (User, State, City, Amenity, Place, Review)
         if cls is None:
-            for class_type in all_classes:
+            for class_type in self.__classes:
                 query = self.__session.query(class_type)
                 for obj in query.all():
                     obj_key = '{}.{}'.format(obj.__class__.__name__, obj.id)
                     objects[obj_key] = obj
         else:
             query = self.__session.query(cls)
+            if load:
+                query = query.options(*self.__load_options(cls, load))
+            if limit is not None or after is not None or order_by:
+                query = self.__page(
+                    query, cls, limit, after, order_by or 'id')
             for obj in query.all():
                 obj_key = '{}.{}'.format(obj.__class__.__name__, obj.id)
                 objects[obj_key] = obj
         return objects
 
+    def iter(self, cls=None, batch_size=1000):
+        """Yields the models currently in storage one at a time
+
+        Args:
+            cls (type): The class of the models to yield.
+            batch_size (int): The number of rows fetched from the database
+            server at a time.
+        """
+        self.__load()
+        for class_type in self.__classes if cls is None else (cls,):
+            if class_type not in self.__classes:
+                continue
+            query = self.__session.query(class_type).yield_per(batch_size)
+            for obj in query:
+                yield obj
+
+    def get(self, cls, id):
+        """Returns the model of a class with the given id or None"""
+        self.__load()
+        if cls not in self.__classes:
+            return None
+        return self.__session.get(cls, id)
+
+    def count(self, cls=None):
+        """Returns the number of models of a class in storage"""
+        self.__load()
+        total = 0
+        for class_type in self.__classes if cls is None else (cls,):
+            if class_type in self.__classes:
+                query = self.__session.query(func.count(class_type.id))
+                total += query.scalar()
+        return total
+
+    def search_places(self, states=(), cities=(), amenities=(),
+                      price=(None, None), guests=(None, None),
+                      limit=None, after=None):
+        """Returns a dictionary of the places matching a search, sorted
+        by name.
+
+        Args:
+            states (iterable): The ids of the states of the places.
+            cities (iterable): The ids of the cities of the places, which
+            are searched together with the cities of the states. All the
+            places are searched when neither is given.
+            amenities (iterable): The ids of amenities all places have.
+            price (tuple): The lowest and highest price by night, None
+            leaving a side open.
+            guests (tuple): The lowest and highest number of guests.
+            limit (int): The maximum number of places to return.
+            after (str): The id of the place the returned ones follow.
+        """
+        self.__load()
+        query = self.__session.query(Place)
+        places_of = []
+        if cities:
+            places_of.append(Place.city_id.in_(list(cities)))
+        if states:
+            places_of.append(Place.city_id.in_(
+                select(City.id).where(City.state_id.in_(list(states)))))
+        if places_of:
+            query = query.filter(or_(*places_of))
+        for amenity_id in dict.fromkeys(amenities):
+            # EXISTS (SELECT ... FROM place_amenity WHERE place_id = ...)
+            query = query.filter(
+                select(place_amenity.c.place_id).where(
+                    place_amenity.c.place_id == Place.id,
+                    place_amenity.c.amenity_id == amenity_id).exists())
+        for column, (low, high) in ((Place.price_by_night, price),
+                                    (Place.max_guest, guests)):
+            if low is not None:
+                query = query.filter(column >= low)
+            if high is not None:
+                query = query.filter(column <= high)
+        query = self.__page(query, Place, limit, after, 'name')
+        objects = dict()
+        for obj in query.all():
+            objects['Place.{}'.format(obj.id)] = obj
+        return objects
+
+    @staticmethod
+    def __page(query, cls, limit, after, attr):
+        """Restricts a query to a page of models in the order of one
+        of their attributes, starting after a keyset cursor:
+        WHERE (attr, id) > (<attr of after>, after) ORDER BY attr, id LIMIT
+        """
+        column = getattr(cls, attr)
+        if after is not None:
+            if attr == 'id':
+                query = query.filter(cls.id > after)
+            else:
+                value = select(column).where(
+                    cls.id == after).scalar_subquery()
+                query = query.filter(
+                    tuple_(column, cls.id) > tuple_(value, after))
+        if attr == 'id':
+            query = query.order_by(cls.id)
+        else:
+            query = query.order_by(column, cls.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    @staticmethod
+    def __load_options(cls, load):
+        """Builds the loader options for eagerly loading relationships"""
+        options = []
+        for item in load:
+            if isinstance(item, str):
+                attr = getattr(cls, item)
+                if attr.property.uselist:
+                    options.append(selectinload(attr))
+                else:
+                    options.append(joinedload(attr))
+            else:
+                options.append(item)
+        return options
+
     def delete(self, obj=None):
         """Removes an object from the storage database"""
+        self.__load()
+        self.__generation += 1
         if obj is not None:
+            self.__deleted_at = datetime.now()
             self.__session.query(type(obj)).filter(
                 type(obj).id == obj.id).delete(
                 synchronize_session=False
             )
+            if obj in self.__session:
+                # keep get() from answering with the deleted object
+                self.__session.expunge(obj)
 
     def new(self, obj):
         """Adds new object to storage database"""
+        self.__load()
+        self.__generation += 1
         if obj is not None:
+            if self.__batching:
+                self.__session.add(obj)
+                return
             try:
                 self.__session.add(obj)
                 self.__session.flush()
@@ -72,13 +266,80 @@ class DBStorage:
                 self.__session.rollback()
                 raise ex
 
+    def bulk_new(self, objs, refresh=False):
+        """Adds several objects to the storage database at once.
+        They are flushed together so that the rows of each table are
+        written with a single multi-row INSERT.
+
+        Args:
+            objs (iterable): The objects to add.
+            refresh (bool): Whether to reload the objects from the database
+            after they are written.
+        """
+        self.__load()
+        self.__generation += 1
+        objs = [obj for obj in objs if obj is not None]
+        try:
+            self.__session.add_all(objs)
+            self.__session.flush()
+            if refresh:
+                for obj in objs:
+                    self.__session.refresh(obj)
+        except Exception as ex:
+            self.__session.rollback()
+            raise ex
+
+    def begin(self):
+        """Starts queuing the objects added and saved until commit()"""
+        self.__batching = True
+
+    def commit(self):
+        """Writes and commits the objects queued since begin()"""
+        self.__batching = False
+        if self.__session is None:
+            # nothing was queued without connecting
+            return
+        self.__generation += 1
+        try:
+            self.__session.flush()
+            self.__session.commit()
+        except Exception as ex:
+            self.__session.rollback()
+            raise ex
+
+    @contextmanager
+    def batch(self):
+        """Queues the objects added and saved inside a with block and
+        writes and commits them together when the block ends.
+        """
+        if self.__batching:
+            yield self
+            return
+        self.begin()
+        try:
+            yield self
+        except Exception as ex:
+            self.__batching = False
+            self.__session.rollback()
+            raise ex
+        self.commit()
+
     def save(self):
         """Commits the session changes to database"""
-        self.__session.commit()
+        self.__load()
+        self.__generation += 1
+        if not self.__batching:
+            self.__session.commit()
 
     def reload(self):
-        """Loads storage database"""
-        Base.metadata.create_all(self.__engine)
+        """Loads storage database.
+        The tables are not created in the prod environment, where the
+        database schema is managed outside of the application.
+        """
+        if self.__engine is None:
+            self.__connect()
+        if os.getenv('HBNB_ENV') != 'prod':
+            Base.metadata.create_all(self.__engine)
         SessionFactory = sessionmaker(
             bind=self.__engine,
             expire_on_commit=False
@@ -87,4 +348,5 @@ class DBStorage:
 
     def close(self):
         """Closes the storage engine."""
-        self.__session.close()
+        if self.__session is not None:
+            self.__session.close()
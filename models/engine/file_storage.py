@@ -1,14 +1,35 @@
 #!/usr/bin/python3
 """This module defines a class to manage file storage for hbnb clone"""
+import atexit
+import bisect
 import json
 import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
 from importlib import import_module
+from itertools import islice
+
+from models.engine.binary_snapshot import BinarySnapshot, write_snapshot
+try:
+    import fcntl
+except ImportError:
+    # no advisory locks, a single process is expected to use the files
+    fcntl = None
 
 
 class FileStorage:
     """This class manages storage of hbnb models in JSON format"""
     __file_path = 'file.json'
+    __binary_path = 'file.bin'
+    __journal_path = 'file.json.log'
+    __lock_path = 'file.json.lock'
+    __journal_limit = 4 * 1024 * 1024
     __objects = {}
+    __classes = {}
+    __indexes = {}
 
     def __init__(self):
         """Initializes a FileStorage instance"""
@@ -21,49 +42,1047 @@ class FileStorage:
             'Place': import_module('models.place').Place,
             'Review': import_module('models.review').Review
         }
+        self.journal = os.getenv('HBNB_FILE_JOURNAL') == '1'
+        """Appends changed objects to a log instead of rewriting the file.
+        """
+        self.format = os.getenv('HBNB_FILE_FORMAT', 'json')
+        """The format of the snapshot file, json or binary.
+        """
+        self.shards = os.getenv('HBNB_FILE_SHARDS') == '1'
+        """Stores the models of each class in their own <class name>.json
+        file in place of file.json.
+        """
+        self.save_window = int(os.getenv('HBNB_FILE_SAVE_WINDOW', '0'))
+        """The number of milliseconds during which saves are coalesced
+        into a single write of the storage files.
+        """
+        self.__snapshot = None
+        self.__unloaded = set()
+        self.__tombstones = set()
+        self.__loaded = False
+        self.__pending = {}
+        self.__batching = False
+        self.__deferred = False
+        self.__file_stat = None
+        self.__file_keys = set()
+        self.__dirty = set()
+        self.__spans = (None, {})
+        self.__sorted = {}
+        self.__generation = 0
+        self.__last_modified = None
+        self.__shard_stats = {}
+        self.__shard_keys = {}
+        self.__journal_offset = 0
+        self.__window_end = None
+        self.__version = None
+        self.__lock_file = None
+        self.__write_lock = threading.RLock()
+        atexit.register(self.flush)
+        # child-to-parent foreign keys used by the relationship properties
+        # and the place search
+        self.register_index(self.model_classes['City'], 'state_id')
+        self.register_index(self.model_classes['Review'], 'place_id')
+        self.register_index(self.model_classes['Place'], 'city_id')
+
+    @property
+    def generation(self):
+        """A number that changes whenever the models in storage change"""
+        self.__load()
+        return self.__generation
+
+    @property
+    def fingerprint(self):
+        """A string that changes whenever the models in storage change,
+        the same in every process that read the same storage files.
+        It is built from the files read, and from this process' own
+        changes while they aren't written yet.
+        """
+        self.__load()
+        local = None
+        if self.__pending or self.__window_end is not None or \
+                self.__changed():
+            local = (os.getpid(), id(self), self.__generation)
+        if self.__sharded():
+            files = []
+            for cls_name in sorted(self.model_classes):
+                if cls_name in self.__shard_stats and \
+                        cls_name not in self.__unloaded:
+                    files.append(self.__shard_stats[cls_name])
+                else:
+                    # read from the file as it is when first accessed
+                    files.append(self.__stat(self.__shard_path(cls_name)))
+        else:
+            files = [self.__file_stat]
+        return repr((self.__version, files, self.__journal_offset, local))
+
+    @property
+    def last_modified(self):
+        """The latest time a model was updated or deleted, or None"""
+        self.__load()
+        latest = self.__last_modified
+        if self.__unloaded:
+            # the files of the models not loaded yet are as recent
+            if self.__sharded():
+                paths = [self.__shard_path(name) for name in self.__unloaded]
+            else:
+                paths = [self.__binary_path]
+            for path in paths:
+                stat = self.__stat(path)
+                if stat is None:
+                    continue
+                modified = datetime.fromtimestamp(stat[1] / 1e9)
+                if latest is None or modified > latest:
+                    latest = modified
+        return latest
+
+    def all(self, cls=None, load=(), limit=None, after=None, order_by=None):
+        """Returns a dictionary of models currently in storage
 
-    def all(self, cls=None):
-        """Returns a dictionary of models currently in storage"""
+        Args:
+            cls (type): The class of the models to return.
+            load (iterable): Ignored, related models are always loaded.
+            limit (int): The maximum number of models to return.
+            after (str): The id of the model the returned ones follow,
+            usually the last one of the previous page.
+            order_by (str): The attribute the models are sorted by, with
+            their id breaking ties. The models are sorted by id when
+            limit or after is given without it.
+        """
+        self.__load()
+        self.__materialize(cls)
+        if cls is not None and \
+                (limit is not None or after is not None or order_by):
+            return self.__page(cls, limit, after, order_by or 'id')
         if cls is None:
             return self.__objects
+        bucket = self.__classes.get(cls.__name__, {})
+        filtered_dict = {}
+        for key, value in bucket.items():
+            if self.__objects.get(key) is value:
+                filtered_dict[key] = value
+        if len(filtered_dict) != len(bucket):
+            # objects were removed from the dictionary returned by all()
+            self.__classes[cls.__name__] = dict(filtered_dict)
+        return filtered_dict
+
+    def __page(self, cls, limit, after, attr):
+        """Returns a page of the models of a class in the order of one
+        of their attributes, found by bisecting a sorted index of it.
+        """
+        return dict(islice(self.__ordered(cls, after, attr), limit))
+
+    def __ordered(self, cls, after, attr):
+        """Yields the keys and models of a class in the order of one of
+        their attributes, starting after the model with the given id.
+        """
+        entries = self.__sorted_index(cls, attr)
+        start = 0
+        if after is not None:
+            if attr == 'id':
+                # the cursor holds the sort key itself
+                start = bisect.bisect_right(entries, (True, after, after))
+            else:
+                obj = self.get(cls, after)
+                if obj is None:
+                    return
+                start = bisect.bisect_right(
+                    entries, self.__sort_key(obj, attr))
+        for entry in islice(entries, start, None):
+            key = '{}.{}'.format(cls.__name__, entry[2])
+            obj = self.__objects.get(key)
+            if obj is not None:
+                yield key, obj
+
+    def search_places(self, states=(), cities=(), amenities=(),
+                      price=(None, None), guests=(None, None),
+                      limit=None, after=None):
+        """Returns a dictionary of the places matching a search, sorted
+        by name.
+
+        Args:
+            states (iterable): The ids of the states of the places.
+            cities (iterable): The ids of the cities of the places, which
+            are searched together with the cities of the states. All the
+            places are searched when neither is given.
+            amenities (iterable): The ids of amenities all places have.
+            price (tuple): The lowest and highest price by night, None
+            leaving a side open.
+            guests (tuple): The lowest and highest number of guests.
+            limit (int): The maximum number of places to return.
+            after (str): The id of the place the returned ones follow.
+        """
+        self.__load()
+        place_cls = self.model_classes['Place']
+        amenities = set(amenities)
+        ranges = (('price_by_night', price), ('max_guest', guests))
+
+        def matches(place):
+            """Tells whether a place passes the filters"""
+            if not amenities.issubset(place.amenity_ids):
+                return False
+            for attr, (low, high) in ranges:
+                value = getattr(place, attr)
+                if (low is not None and value < low) or \
+                        (high is not None and value > high):
+                    return False
+            return True
+
+        if states or cities:
+            # a few cities: their places are found through the city_id
+            # index and sorted, rather than walking all the places
+            city_ids = set(cities)
+            for state_id in states:
+                city_ids.update(
+                    city.id for city in self.lookup(
+                        self.model_classes['City'], 'state_id',
+                        state_id).values())
+            cursor = None
+            if after is not None:
+                obj = self.get(place_cls, after)
+                if obj is None:
+                    return {}
+                cursor = self.__sort_key(obj, 'name')
+            found = []
+            for city_id in city_ids:
+                for key, obj in self.lookup(
+                        place_cls, 'city_id', city_id).items():
+                    entry = self.__sort_key(obj, 'name')
+                    if cursor is None or entry > cursor:
+                        found.append((entry, key, obj))
+            found.sort()
+            places = ((key, obj) for entry, key, obj in found)
+        else:
+            # amenities and ranges aren't indexed: the places are tested
+            # in order until the page is full
+            places = self.__ordered(place_cls, after, 'name')
+        return dict(islice(
+            ((key, obj) for key, obj in places if matches(obj)), limit))
+
+    def __sorted_index(self, cls, attr):
+        """Returns the sort keys of the models of a class, in order.
+        The index is built when it is first used and then kept in order
+        as models are added, removed or have the attribute set.
+        """
+        views = self.__sorted.setdefault(cls.__name__, {})
+        view = views.get(attr)
+        if view is None:
+            by_id = {}
+            for obj in self.all(cls).values():
+                by_id[obj.id] = self.__sort_key(obj, attr)
+            view = (sorted(by_id.values()), by_id)
+            views[attr] = view
         else:
-            filtered_dict = {}
-            for key, value in self.__objects.items():
-                if type(value) is cls:
-                    filtered_dict[key] = value
-            return filtered_dict
+            attrs = attr if type(attr) is tuple else (attr,)
+            for obj in cls.changed():
+                key = '{}.{}'.format(cls.__name__, obj.id)
+                if not obj.changes().isdisjoint(attrs) and \
+                        self.__objects.get(key) is obj:
+                    self.__resort(obj)
+        return view[0]
+
+    def __resort(self, obj):
+        """Moves a model to its place in the sorted indexes of its class"""
+        self.__unsort(obj)
+        for attr, (entries, by_id) in \
+                self.__sorted.get(type(obj).__name__, {}).items():
+            entry = self.__sort_key(obj, attr)
+            by_id[obj.id] = entry
+            bisect.insort(entries, entry)
+
+    def __unsort(self, obj):
+        """Removes a model from the sorted indexes of its class"""
+        for entries, by_id in \
+                self.__sorted.get(type(obj).__name__, {}).values():
+            entry = by_id.pop(obj.id, None)
+            if entry is not None:
+                del entries[bisect.bisect_left(entries, entry)]
+
+    @staticmethod
+    def __sort_key(obj, attr):
+        """Returns the sort key of a model, models without the attribute
+        coming first. A tuple of attributes sorts the models by each in
+        turn.
+        """
+        if type(attr) is tuple:
+            value = tuple(FileStorage.__sort_key(obj, name)[:2]
+                          for name in attr)
+        else:
+            value = getattr(obj, attr, None)
+        return (value is not None, value, obj.id)
+
+    def iter(self, cls=None, batch_size=None):
+        """Yields the models currently in storage one at a time
+
+        Args:
+            cls (type): The class of the models to yield.
+            batch_size (int): Ignored, the models are already in memory.
+        """
+        for obj in tuple(self.all(cls).values()):
+            yield obj
+
+    def get(self, cls, id):
+        """Returns the model of a class with the given id or None"""
+        self.__load()
+        key = '{}.{}'.format(cls.__name__, id)
+        obj = self.__objects.get(key)
+        if obj is None and cls.__name__ in self.__unloaded and \
+                key not in self.__tombstones:
+            if self.__snapshot is None:
+                # shard files are read whole
+                self.__materialize(cls)
+                return self.__objects.get(key)
+            val = self.__snapshot.load_one(cls.__name__, id)
+            if val is not None:
+                obj = cls.from_dict(self.__compact(val))
+                self.__add(key, obj)
+        return obj
+
+    def count(self, cls=None):
+        """Returns the number of models of a class in storage"""
+        self.__load()
+        names = self.model_classes if cls is None else [cls.__name__]
+        # classes only in the binary snapshot, none of whose models were
+        # loaded or deleted, are counted from its directory
+        counted = [name for name in names if self.__countable(name)]
+        for name in names:
+            if name not in counted:
+                self.__materialize(self.model_classes[name])
+        total = sum(self.__snapshot.count(name) for name in counted)
+        if cls is None:
+            return total + len(self.__objects)
+        return total if counted else len(self.all(cls))
+
+    def __countable(self, cls_name):
+        """Returns whether the binary snapshot holds all the models of a
+        class, so that they can be counted without loading them.
+        """
+        if self.__snapshot is None or cls_name not in self.__unloaded:
+            return False
+        for key, obj in self.__classes.get(cls_name, {}).items():
+            if self.__objects.get(key) is obj:
+                return False
+        prefix = cls_name + '.'
+        return not any(key.startswith(prefix) for key in self.__tombstones)
+
+    def register_index(self, cls, attr):
+        """Maintains an index of the objects of a class by the value
+        of one of their attributes.
+
+        Args:
+            cls (type): The model class to index.
+            attr (str): The name of the attribute to index by.
+        """
+        indexes = self.__indexes.setdefault(cls.__name__, {})
+        if attr in indexes:
+            return
+        indexes[attr] = ({}, {})
+        for key, value in self.__classes.get(cls.__name__, {}).items():
+            if self.__objects.get(key) is value:
+                self.__index(key, value)
+
+    def lookup(self, cls, attr, value, order_by=None):
+        """Returns a dictionary of the objects of a class whose
+        attribute has the given value.
+
+        Args:
+            cls (type): The model class to search.
+            attr (str): The name of the attribute to match.
+            value (any): The value to match.
+            order_by (str): The attribute the objects are sorted by, with
+            their id breaking ties, read from a sorted index of attr and
+            order_by kept in order as models change.
+        """
+        self.__load()
+        self.__materialize(cls)
+        if order_by is not None:
+            return self.__lookup_ordered(cls, attr, value, order_by)
+        index = self.__indexes.get(cls.__name__, {}).get(attr)
+        if index is None:
+            candidates = self.all(cls)
+        else:
+            candidates = index[0].get(value, {})
+        filtered_dict = {}
+        for key, obj in candidates.items():
+            if self.__objects.get(key) is obj and \
+                    getattr(obj, attr, None) == value:
+                filtered_dict[key] = obj
+        return filtered_dict
+
+    def __lookup_ordered(self, cls, attr, value, order_by):
+        """Returns the objects of a class whose attribute has the given
+        value, in the order of another attribute, found by bisecting a
+        sorted index of both.
+        """
+        entries = self.__sorted_index(cls, (attr, order_by))
+        prefix = (value is not None, value)
+        start = bisect.bisect_left(entries, (True, (prefix,)))
+        filtered_dict = {}
+        for entry in islice(entries, start, None):
+            if entry[1][0] != prefix:
+                break
+            key = '{}.{}'.format(cls.__name__, entry[2])
+            obj = self.__objects.get(key)
+            if obj is not None:
+                filtered_dict[key] = obj
+        return filtered_dict
 
     def delete(self, obj=None):
         """Removes an object from the storage dictionary"""
+        self.__load()
         if obj is not None:
-            obj_key = obj.to_dict()['__class__'] + '.' + obj.id
+            obj_key = type(obj).__name__ + '.' + obj.id
             if obj_key in self.__objects.keys():
-                del self.__objects[obj_key]
+                self.__remove(obj_key)
+                self.__pending[obj_key] = None
+                self.__dirty.add(obj_key.partition('.')[0])
 
     def new(self, obj):
         """Adds new object to storage dictionary"""
-        self.__objects.update(
-            {obj.to_dict()['__class__'] + '.' + obj.id: obj}
-        )
+        self.__load()
+        obj_key = type(obj).__name__ + '.' + obj.id
+        self.__add(obj_key, obj)
+        self.__pending[obj_key] = obj
+        self.__dirty.add(obj_key.partition('.')[0])
+
+    def __add(self, key, obj):
+        """Stores an object and files it in its class bucket and indexes"""
+        self.__generation += 1
+        updated_at = getattr(obj, 'updated_at', None)
+        if isinstance(updated_at, datetime) and \
+                (self.__last_modified is None or
+                 updated_at > self.__last_modified):
+            self.__last_modified = updated_at
+        old = self.__objects.get(key)
+        if old is not obj:
+            # the record last written for the key is not this object's
+            self.__spans[1].pop(key, None)
+            if old is not None:
+                self.__unindex(key, old)
+        self.__objects[key] = obj
+        self.__classes.setdefault(type(obj).__name__, {})[key] = obj
+        if self.__sorted:
+            self.__resort(obj)
+        self.__index(key, obj)
+
+    def __remove(self, key):
+        """Removes a stored object from its class bucket and indexes"""
+        obj = self.__objects.pop(key, None)
+        self.__spans[1].pop(key, None)
+        self.__generation += 1
+        if obj is not None:
+            self.__last_modified = datetime.now()
+            self.__unindex(key, obj)
+            if self.__sorted:
+                self.__unsort(obj)
+        if key.partition('.')[0] in self.__unloaded:
+            # keep the stale record in the snapshot from being loaded
+            self.__tombstones.add(key)
+
+    def __index(self, key, obj):
+        """Files an object under its current value in its class' indexes"""
+        indexes = self.__indexes.get(type(obj).__name__, {})
+        for attr, (by_value, by_key) in indexes.items():
+            value = getattr(obj, attr, None)
+            if key in by_key:
+                if by_key[key] == value and \
+                        by_value.get(value, {}).get(key) is obj:
+                    continue
+                old_bucket = by_value.get(by_key[key], {})
+                old_bucket.pop(key, None)
+                if not old_bucket:
+                    by_value.pop(by_key[key], None)
+            by_key[key] = value
+            by_value.setdefault(value, {})[key] = obj
+
+    def __unindex(self, key, obj):
+        """Removes an object from its class bucket and indexes"""
+        cls_name = type(obj).__name__
+        self.__classes.get(cls_name, {}).pop(key, None)
+        indexes = self.__indexes.get(cls_name, {})
+        for attr, (by_value, by_key) in indexes.items():
+            if key not in by_key:
+                continue
+            value = by_key.pop(key)
+            bucket = by_value.get(value, {})
+            bucket.pop(key, None)
+            if not bucket:
+                by_value.pop(value, None)
+
+    def bulk_new(self, objs, refresh=False):
+        """Adds several objects to storage dictionary
+
+        Args:
+            objs (iterable): The objects to add.
+            refresh (bool): Ignored, the objects are not changed by storing.
+        """
+        for obj in objs:
+            if obj is not None:
+                self.new(obj)
+
+    def begin(self):
+        """Defers saving the storage dictionary until commit()"""
+        self.__batching = True
+
+    def commit(self):
+        """Saves the storage dictionary if it was saved since begin()"""
+        self.__batching = False
+        if self.__deferred:
+            self.save()
+
+    @contextmanager
+    def batch(self):
+        """Saves the storage dictionary once at the end of a with block
+        no matter how many times it is saved inside it.
+        """
+        if self.__batching:
+            yield self
+            return
+        self.begin()
+        try:
+            yield self
+        finally:
+            self.commit()
 
     def save(self):
         """Saves storage dictionary to file"""
-        with open(self.__file_path, 'w') as file:
+        self.__generation += 1
+        if self.__batching:
+            self.__deferred = True
+            return
+        self.__deferred = False
+        self.__load()
+        if self.save_window > 0:
+            # written by the first save after the window ends, on the
+            # thread saving, so that no write races the models in use
+            now = time.monotonic()
+            with self.__write_lock:
+                if self.__window_end is None:
+                    self.__window_end = now + self.save_window / 1000
+                if now < self.__window_end:
+                    return
+                self.__write()
+                self.__window_end = None
+            return
+        self.__write()
+
+    def flush(self):
+        """Writes the saves still waiting for the end of the save window"""
+        with self.__write_lock:
+            if self.__window_end is None:
+                return
+            self.__write()
+            self.__window_end = None
+
+    def __write(self):
+        """Writes the changes to the storage files"""
+        with self.__write_lock, self.__locked(True) as lock:
+            self.__refresh(lock)
+            if self.journal and self.__has_snapshot():
+                self.__append_journal()
+                if os.path.getsize(self.__journal_path) > \
+                        self.__journal_limit:
+                    self.compact()
+            else:
+                self.compact()
+
+    def compact(self):
+        """Writes a full snapshot of the storage dictionary to file
+        and discards the journal it supersedes. Shard files are only
+        written for the classes whose models changed.
+        """
+        self.__load()
+        with self.__write_lock, self.__locked(True) as lock:
+            self.__refresh(lock)
+            if self.__sharded():
+                self.__write_shards()
+            else:
+                self.__write_snapshot()
+            if os.path.isfile(self.__journal_path):
+                os.remove(self.__journal_path)
+            self.__version = self.__read_version(lock) + 1
+            lock.seek(0)
+            lock.truncate()
+            lock.write(str(self.__version))
+            lock.flush()
+        self.__journal_offset = 0
+
+    def __write_snapshot(self):
+        """Writes all the models to the snapshot file"""
+        self.__materialize()
+        pending = self.__pending
+        self.__pending = {}
+        self.__dirty = set()
+        objects = dict(self.__objects)
+        changed = self.__changed()
+        if self.format == 'binary':
+            self.__close_snapshot()
+            with self.__replace(self.__binary_path, 'wb') as file:
+                write_snapshot(file, objects)
+        else:
+            self.__write_json(objects, changed, pending)
+        for val in changed.values():
+            self.__stored(val)
+        self.__file_stat = self.__stat(self.__snapshot_path())
+        self.__file_keys = set(objects.keys())
+
+    def __write_json(self, objects, changed, pending):
+        """Writes the models to file.json, copying the items of the
+        models unchanged since this process last wrote it from the file
+        rather than encoding them again. Only the positions of the
+        items are kept between writes, not their text.
+        """
+        stat, spans = self.__spans
+        old = None
+        if spans and stat == self.__stat(self.__file_path):
+            with open(self.__file_path, 'rb') as file:
+                old = file.read()
+        parts = [b'{']
+        position = 1
+        new_spans = {}
+        for key, val in objects.items():
+            span = None
+            if old is not None and key not in changed and \
+                    key not in pending:
+                span = spans.get(key)
+            if span is None:
+                item = (json.dumps(key) + ': ' +
+                        json.dumps(val.to_dict(False))).encode()
+            else:
+                start = span >> 32
+                item = old[start:start + (span & 0xffffffff)]
+            if new_spans:
+                parts.append(b', ')
+                position += 2
+            # the offset and the length in a single int to save memory
+            new_spans[key] = position << 32 | len(item)
+            position += len(item)
+            parts.append(item)
+        parts.append(b'}')
+        with self.__replace(self.__file_path, 'wb') as file:
+            file.write(b''.join(parts))
+        self.__spans = (self.__stat(self.__file_path), new_spans)
+
+    def __write_shards(self):
+        """Writes the shard files of the classes whose models changed"""
+        changed = self.__changed()
+        dirty = self.__dirty
+        dirty.update(key.partition('.')[0] for key in changed)
+        self.__pending = {}
+        self.__dirty = set()
+        for cls_name in dirty:
+            self.__materialize(self.model_classes[cls_name])
             temp = {}
-            for key, val in self.__objects.items():
-                temp[key] = val.to_dict()
-            json.dump(temp, file)
+            for key, val in self.__classes.get(cls_name, {}).items():
+                if self.__objects.get(key) is val:
+                    temp[key] = val.to_dict(False)
+            path = self.__shard_path(cls_name)
+            with self.__replace(path, 'w') as file:
+                json.dump(temp, file)
+            self.__shard_stats[cls_name] = self.__stat(path)
+            self.__shard_keys[cls_name] = set(temp.keys())
+        for key, val in changed.items():
+            self.__spans[1].pop(key, None)
+            self.__stored(val)
+
+    def __stored(self, obj):
+        """Records that a changed model was written to the files"""
+        if self.__sorted:
+            # its sorted attributes may have been set without new()
+            self.__resort(obj)
+        obj.mark_stored()
+
+    def __changed(self):
+        """Returns the stored models with changes not written yet"""
+        changed = {}
+        for obj in self.model_classes['BaseModel'].changed():
+            key = '{}.{}'.format(type(obj).__name__, obj.id)
+            if self.__objects.get(key) is obj:
+                changed[key] = obj
+        return changed
 
     def reload(self):
         """Loads storage dictionary from file"""
+        self.flush()
+        self.__loaded = True
+        # rebuilt when next used rather than kept in order model by model
+        self.__sorted.clear()
+        with self.__write_lock, self.__locked(False) as lock:
+            self.__version = self.__read_version(lock)
+            self.__load_snapshot()
+            self.__journal_offset = 0
+            self.__load_journal()
+
+    def close(self):
+        """Closes the storage engine, picking up any changes made
+        to the storage files since they were last read.
+        """
+        if not self.__loaded:
+            return
+        self.flush()
+        with self.__write_lock, self.__locked(False) as lock:
+            self.__refresh(lock)
+
+    def __refresh(self, lock):
+        """Picks up the changes committed by other processes since the
+        storage files were last read, keeping the unsaved changes.
+
+        Args:
+            lock (file): The lock file, holding the snapshot version.
+        """
+        version = self.__read_version(lock)
+        if self.__sharded():
+            if version != self.__version:
+                self.__journal_offset = 0
+            self.__load_snapshot(delta=True)
+        elif version != self.__version or \
+                self.__stat(self.__snapshot_path()) != self.__file_stat:
+            self.__load_snapshot(delta=True)
+            self.__journal_offset = 0
+        self.__load_journal(delta=True)
+        self.__version = version
+
+    @contextmanager
+    def __locked(self, exclusive):
+        """Holds an advisory lock on the storage files, shared by readers
+        or exclusive to one writer, and yields the lock file. The lock
+        file also holds the version of the snapshot, bumped by each write
+        of a new snapshot.
+
+        Args:
+            exclusive (bool): Whether to lock the files for writing.
+        """
+        if self.__lock_file is not None:
+            # already held by this thread, which holds the write lock
+            yield self.__lock_file
+            return
+        fd = os.open(self.__lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+        with os.fdopen(fd, 'r+') as file:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self.__lock_file = file
+            try:
+                yield file
+            finally:
+                self.__lock_file = None
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def __read_version(lock):
+        """Returns the snapshot version held by the lock file"""
+        lock.seek(0)
+        version = lock.read().strip()
+        return int(version) if version.isdigit() else 0
+
+    def __load(self):
+        """Loads the storage files the first time the storage is used"""
+        if not self.__loaded:
+            self.reload()
+
+    @staticmethod
+    @contextmanager
+    def __replace(path, mode):
+        """Opens a temporary file that atomically replaces a file once it
+        is fully written and synced to disk, so that readers never see a
+        partially written file and a crash never loses the previous one.
+
+        Args:
+            path (str): The path of the file to replace.
+            mode (str): The mode to open the temporary file with.
+        """
+        temp = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            with open(temp, mode) as file:
+                yield file
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp, path)
+        except BaseException:
+            if os.path.isfile(temp):
+                os.remove(temp)
+            raise
+        if hasattr(os, 'O_DIRECTORY'):
+            # make the rename itself durable
+            fd = os.open(os.path.dirname(os.path.abspath(path)),
+                         os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def __snapshot_path(self):
+        """Returns the path of the snapshot file in the current format"""
+        if self.format == 'binary':
+            return self.__binary_path
+        return self.__file_path
+
+    @staticmethod
+    def __stat(path):
+        """Returns the identity of a file's current contents or None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def __compact(val):
+        """Shares one copy of each foreign key id among the loaded objects
+        that refer to it instead of keeping one string per object.
+        """
+        for key in ('state_id', 'city_id', 'user_id', 'place_id'):
+            value = val.get(key)
+            if type(value) is str:
+                val[key] = sys.intern(value)
+        return val
+
+    def __load_snapshot(self, delta=False):
+        """Loads the objects in the snapshot file.
+
+        Args:
+            delta (bool): Whether to rebuild only the objects whose stored
+            record differs from the loaded one and drop the objects that
+            were removed from the file since it was last read.
+        """
+        migrating = (self.format == 'binary' or self.shards) and \
+            not self.__has_snapshot() and os.path.isfile(self.__file_path)
+        if migrating:
+            # the models are read from file.json until they are first
+            # written in the new format
+            self.__close_snapshot()
+        elif self.format == 'binary':
+            self.__open_snapshot(delta)
+            return
+        elif self.shards:
+            self.__load_shards(delta)
+            return
+        stat = self.__stat(self.__file_path)
+        if stat is None:
+            self.__file_stat = None
+            return
+        with open(self.__file_path, 'r') as file:
+            temp = json.load(file)
+        self.__load_records(temp, delta, self.__file_keys)
+        self.__file_keys = set(temp.keys())
+        self.__file_stat = stat
+        if migrating:
+            self.__dirty.update(key.partition('.')[0] for key in temp)
+
+    def __load_records(self, temp, delta, old_keys):
+        """Stores the models of a file's records.
+
+        Args:
+            temp (dict): The records of the file, keyed by model key.
+            delta (bool): Whether to rebuild only the objects whose stored
+            record differs from the loaded one and drop the objects that
+            were removed from the file since it was last read.
+            old_keys (set): The keys of the file when it was last read.
+        """
         classes = self.model_classes
-        if os.path.isfile(self.__file_path):
-            temp = {}
-            with open(self.__file_path, 'r') as file:
+        for key, val in temp.items():
+            if delta:
+                if key in self.__pending:
+                    # changed in this process since the last save
+                    continue
+                obj = self.__objects.get(key)
+                if obj is not None and \
+                        (obj.to_dict(False) == val or obj.changes()):
+                    continue
+            cls = classes[val['__class__']]
+            self.__add(key, cls.from_dict(self.__compact(val)))
+        if delta:
+            for key in old_keys.difference(temp.keys()):
+                if key not in self.__pending:
+                    self.__remove(key)
+
+    def __load_shards(self, delta=False):
+        """Loads the objects in the shard files. The models of each class
+        are only read from their shard when they are first accessed.
+
+        Args:
+            delta (bool): Whether to only pick up the changes made to the
+            shards already read since they were last read.
+        """
+        if not delta:
+            self.__close_snapshot()
+            for key in list(self.__objects.keys()):
+                self.__remove(key)
+            self.__shard_stats.clear()
+            self.__shard_keys.clear()
+            for cls_name in self.model_classes:
+                if os.path.isfile(self.__shard_path(cls_name)):
+                    self.__unloaded.add(cls_name)
+            self.__restore_pending()
+            return
+        for cls_name in self.model_classes:
+            if cls_name in self.__unloaded:
+                # read from scratch when first accessed
+                continue
+            stat = self.__stat(self.__shard_path(cls_name))
+            if stat != self.__shard_stats.get(cls_name):
+                temp, old_keys = self.__read_shard(cls_name)
+                self.__load_records(temp, True, old_keys)
+
+    def __read_shard(self, cls_name):
+        """Reads the records of a class' shard file.
+
+        Returns:
+            The records of the file and the keys it had when last read.
+        """
+        path = self.__shard_path(cls_name)
+        stat = self.__stat(path)
+        temp = {}
+        if stat is not None:
+            with open(path, 'r') as file:
                 temp = json.load(file)
-                for key, val in temp.items():
-                    self.all()[key] = classes[val['__class__']](**val)
+        old_keys = self.__shard_keys.get(cls_name, set())
+        self.__shard_stats[cls_name] = stat
+        self.__shard_keys[cls_name] = set(temp.keys())
+        return temp, old_keys
 
-    def close(self):
-        """Closes the storage engine."""
-        self.reload()
+    def __shard_path(self, cls_name):
+        """Returns the path of the shard file of a class"""
+        return '{}.json'.format(cls_name)
+
+    def __sharded(self):
+        """Returns whether the models are stored in shard files"""
+        return self.shards and self.format != 'binary'
+
+    def __has_snapshot(self):
+        """Returns whether the snapshot file or a shard file exists"""
+        if self.__sharded():
+            return any(os.path.isfile(self.__shard_path(cls_name))
+                       for cls_name in self.model_classes)
+        return os.path.isfile(self.__snapshot_path())
+
+    def __open_snapshot(self, delta=False):
+        """Opens the binary snapshot file in place of the models in memory.
+        The models of each class are only loaded from it when they are
+        first accessed.
+
+        Args:
+            delta (bool): Whether to also keep the models changed with
+            setattr since the last save.
+        """
+        changed = self.__changed() if delta else {}
+        self.__close_snapshot()
+        for key in list(self.__objects.keys()):
+            self.__remove(key)
+        self.__objects.clear()
+        self.__file_stat = self.__stat(self.__binary_path)
+        if self.__file_stat is not None:
+            self.__snapshot = BinarySnapshot(self.__binary_path)
+            self.__unloaded.update(self.__snapshot.classes())
+        self.__restore_pending()
+        for key, obj in changed.items():
+            if key not in self.__pending:
+                self.__add(key, obj)
+
+    def __restore_pending(self):
+        """Puts back the models added or deleted in this process since the
+        last save over the models still to be loaded from the files.
+        """
+        for key, obj in self.__pending.items():
+            if obj is None:
+                self.__tombstones.add(key)
+            else:
+                self.__add(key, obj)
+
+    def __close_snapshot(self):
+        """Releases the binary snapshot file"""
+        if self.__snapshot is not None:
+            self.__snapshot.close()
+            self.__snapshot = None
+        self.__unloaded.clear()
+        self.__tombstones.clear()
+
+    def __materialize(self, cls=None):
+        """Loads the models of a class, or of every class, that are still
+        only stored in the binary snapshot file.
+        """
+        if not self.__unloaded:
+            return
+        if cls is None:
+            cls_names = list(self.__unloaded)
+        elif cls.__name__ in self.__unloaded:
+            cls_names = [cls.__name__]
+        else:
+            return
+        classes = self.model_classes
+        for cls_name in cls_names:
+            self.__unloaded.discard(cls_name)
+            if self.__snapshot is None:
+                records = self.__read_shard(cls_name)[0].values()
+            else:
+                records = self.__snapshot.load(cls_name)
+            for val in records:
+                key = '{}.{}'.format(val['__class__'], val['id'])
+                if key in self.__objects or key in self.__tombstones:
+                    continue
+                model = classes[val['__class__']]
+                self.__add(key, model.from_dict(self.__compact(val)))
+        if not self.__unloaded:
+            self.__close_snapshot()
+
+    def __append_journal(self):
+        """Appends an upsert or delete record for every object
+        changed since the last save to the journal.
+        """
+        pending, self.__pending = self.__pending, {}
+        for key, obj in self.__changed().items():
+            pending.setdefault(key, obj)
+        lines = []
+        for key, obj in pending.items():
+            if obj is None:
+                record = {'op': 'delete', 'key': key}
+            else:
+                record = {'op': 'upsert', 'key': key, 'value': obj.to_dict()}
+            lines.append(json.dumps(record) + '\n')
+        with open(self.__journal_path, 'a') as file:
+            up_to_date = file.tell() == self.__journal_offset
+            file.writelines(lines)
+            file.flush()
+            os.fsync(file.fileno())
+            if up_to_date:
+                self.__journal_offset = file.tell()
+        for key, obj in pending.items():
+            # the record in file.json and the class' shard are outdated
+            self.__spans[1].pop(key, None)
+            self.__dirty.add(key.partition('.')[0])
+            if obj is not None:
+                self.__stored(obj)
+
+    def __load_journal(self, delta=False):
+        """Applies the journal records written after the last one read
+
+        Args:
+            delta (bool): Whether to skip the records of the objects
+            changed in this process since the last save.
+        """
+        classes = self.model_classes
+        if not os.path.isfile(self.__journal_path):
+            self.__journal_offset = 0
+            return
+        if os.path.getsize(self.__journal_path) == self.__journal_offset:
+            return
+        with open(self.__journal_path, 'rb') as file:
+            file.seek(self.__journal_offset)
+            while True:
+                line = file.readline()
+                if not line.endswith(b'\n'):
+                    # the end of the file or a record still being appended
+                    break
+                self.__journal_offset = file.tell()
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                key = record['key']
+                if delta and key in self.__pending:
+                    continue
+                self.__dirty.add(key.partition('.')[0])
+                if record['op'] == 'delete':
+                    self.__remove(key)
+                else:
+                    val = self.__compact(record['value'])
+                    cls = classes[val['__class__']]
+                    self.__add(key, cls.from_dict(val))
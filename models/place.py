@@ -1,13 +1,15 @@
 #!/usr/bin/python3
 """ Place Module for HBNB project """
 import os
-from sqlalchemy import Column, Float, ForeignKey, Integer, String, Table
-from sqlalchemy.orm import relationship
 
 from models.base_model import BaseModel, Base
 from models.review import Review
 from models.amenity import Amenity
 
+if os.getenv('HBNB_TYPE_STORAGE') == 'db':
+    from sqlalchemy import Column, Float, ForeignKey, Integer, String, Table
+    from sqlalchemy.orm import relationship
+
 
 place_amenity = Table(
     'place_amenity',
@@ -24,9 +26,10 @@ place_amenity = Table(
         String(60),
         ForeignKey('amenities.id'),
         nullable=False,
-        primary_key=True
+        primary_key=True,
+        index=True
     )
-)
+) if os.getenv('HBNB_TYPE_STORAGE') == 'db' else None
 """Represents the many to many relationship table
 between Place and Amenity records.
 """
@@ -36,13 +39,13 @@ class Place(BaseModel, Base):
     """ A place to stay """
     __tablename__ = 'places'
     city_id = Column(
-        String(60), ForeignKey('cities.id'), nullable=False
+        String(60), ForeignKey('cities.id'), nullable=False, index=True
     ) if os.getenv('HBNB_TYPE_STORAGE') == 'db' else ''
     user_id = Column(
         String(60), ForeignKey('users.id'), nullable=False
     ) if os.getenv('HBNB_TYPE_STORAGE') == 'db' else ''
     name = Column(
-        String(128), nullable=False
+        String(128), nullable=False, index=True
     ) if os.getenv('HBNB_TYPE_STORAGE') == 'db' else ''
     description = Column(
         String(1024), nullable=True
@@ -54,10 +57,10 @@ class Place(BaseModel, Base):
         Integer, nullable=False, default=0
     ) if os.getenv('HBNB_TYPE_STORAGE') == 'db' else 0
     max_guest = Column(
-        Integer, nullable=False, default=0
+        Integer, nullable=False, default=0, index=True
     ) if os.getenv('HBNB_TYPE_STORAGE') == 'db' else 0
     price_by_night = Column(
-        Integer, nullable=False, default=0
+        Integer, nullable=False, default=0, index=True
     ) if os.getenv('HBNB_TYPE_STORAGE') == 'db' else 0
     latitude = Column(
         Float, nullable=True
@@ -84,24 +87,22 @@ class Place(BaseModel, Base):
             """Returns the amenities of this Place"""
             from models import storage
             amenities_of_place = []
-            for value in storage.all(Amenity).values():
-                if value.id in self.amenity_ids:
+            for amenity_id in dict.fromkeys(self.amenity_ids):
+                value = storage.get(Amenity, amenity_id)
+                if value is not None:
                     amenities_of_place.append(value)
             return amenities_of_place
 
         @amenities.setter
         def amenities(self, value):
             """Adds an amenity to this Place"""
-            if type(value) is Amenity:
-                if value.id not in self.amenity_ids:
-                    self.amenity_ids.append(value.id)
+            if type(value) is Amenity and value.id not in self.amenity_ids:
+                # a new list, shared by no other Place, whose assignment
+                # is recorded as a change
+                self.amenity_ids = self.amenity_ids + [value.id]
 
         @property
         def reviews(self):
             """Returns the reviews of this Place"""
             from models import storage
-            reviews_of_place = []
-            for value in storage.all(Review).values():
-                if value.place_id == self.id:
-                    reviews_of_place.append(value)
-            return reviews_of_place
+            return list(storage.lookup(Review, 'place_id', self.id).values())
@@ -1,11 +1,13 @@
 #!/usr/bin/python3
 """ Review module for the HBNB project """
 import os
-from sqlalchemy import Column, ForeignKey, String
-from sqlalchemy.orm import relationship
 
 from models.base_model import BaseModel, Base
 
+if os.getenv('HBNB_TYPE_STORAGE') == 'db':
+    from sqlalchemy import Column, ForeignKey, String
+    from sqlalchemy.orm import relationship
+
 
 class Review(BaseModel, Base):
     """ Review classto store review information """
@@ -1,12 +1,14 @@
 #!/usr/bin/python3
 """ State Module for HBNB project """
 import os
-from sqlalchemy import Column, String
-from sqlalchemy.orm import relationship
 
 from models.base_model import BaseModel, Base
 from models.city import City
 
+if os.getenv('HBNB_TYPE_STORAGE') == 'db':
+    from sqlalchemy import Column, String
+    from sqlalchemy.orm import relationship
+
 
 class State(BaseModel, Base):
     """ State class """
@@ -18,15 +20,13 @@ class State(BaseModel, Base):
         cities = relationship(
             'City',
             cascade='all, delete, delete-orphan',
-            backref='state'
+            backref='state',
+            order_by='(City.name, City.id)'
         )
     else:
         @property
         def cities(self):
-            """Returns the cities in this State"""
+            """Returns the cities in this State, sorted by name"""
             from models import storage
-            cities_in_state = []
-            for value in storage.all(City).values():
-                if value.state_id == self.id:
-                    cities_in_state.append(value)
-            return cities_in_state
+            return list(storage.lookup(
+                City, 'state_id', self.id, order_by='name').values())
@@ -1,11 +1,13 @@
 #!/usr/bin/python3
 """This module defines a class User"""
 import os
-from sqlalchemy import Column, String
-from sqlalchemy.orm import relationship
 
 from models.base_model import BaseModel, Base
 
+if os.getenv('HBNB_TYPE_STORAGE') == 'db':
+    from sqlalchemy import Column, String
+    from sqlalchemy.orm import relationship
+
 
 class User(BaseModel, Base):
     """This class defines a user by various attributes"""
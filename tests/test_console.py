@@ -11,14 +11,21 @@ from unittest.mock import patch
 
 from console import HBNBCommand
 from models import storage
+from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.user import User
-from tests import clear_stream
+from tests import clear_stream, delete_file
 
 
 class TestHBNBCommand(unittest.TestCase):
     """Represents the test class for the HBNBCommand class.
     """
+    def tearDown(self):
+        """Removes the storage files.
+        """
+        for path in ('file.json', 'file.json.lock'):
+            delete_file(path)
+
     @unittest.skipIf(
         os.getenv('HBNB_TYPE_STORAGE') == 'db', 'FileStorage test')
     def test_fs_create(self):
@@ -42,6 +49,94 @@ class TestHBNBCommand(unittest.TestCase):
             self.assertIn("'age': 17", cout.getvalue().strip())
             self.assertIn("'height': 5.9", cout.getvalue().strip())
 
+    @unittest.skipIf(
+        os.getenv('HBNB_TYPE_STORAGE') == 'db', 'FileStorage test')
+    def test_fs_count(self):
+        """Tests the count command with the file storage.
+        """
+        with patch('sys.stdout', new=StringIO()) as cout:
+            cons = HBNBCommand()
+            cons.onecmd('count State')
+            prev_count = int(cout.getvalue().strip())
+            cons.onecmd('create State name="Enugu"')
+            clear_stream(cout)
+            cons.onecmd('count State')
+            self.assertEqual(int(cout.getvalue().strip()), prev_count + 1)
+            clear_stream(cout)
+            cons.onecmd('count Unknown')
+            self.assertEqual(cout.getvalue().strip(), '0')
+
+    @unittest.skipIf(
+        os.getenv('HBNB_TYPE_STORAGE') == 'db', 'FileStorage test')
+    def test_fs_all(self):
+        """Tests the all command options with the file storage.
+        """
+        with patch('sys.stdout', new=StringIO()) as cout:
+            cons = HBNBCommand()
+            cons.onecmd('create Amenity name="Wifi"')
+            cons.onecmd('create Amenity name="Pool"')
+            clear_stream(cout)
+            amenities = list(storage.all(Amenity).values())
+            cons.onecmd('all Amenity')
+            self.assertEqual(
+                cout.getvalue(), str([str(v) for v in amenities]) + '\n')
+            clear_stream(cout)
+            cons.onecmd('all Amenity offset=1 limit=1')
+            self.assertEqual(
+                cout.getvalue(), str([str(amenities[1])]) + '\n')
+            clear_stream(cout)
+            cons.onecmd('all Amenity format=ndjson limit=1')
+            self.assertEqual(
+                json.loads(cout.getvalue()), amenities[0].to_dict())
+            clear_stream(cout)
+            cons.onecmd('all Amenity limit=x')
+            self.assertEqual(cout.getvalue(), '** invalid option **\n')
+
+    @unittest.skipIf(
+        os.getenv('HBNB_TYPE_STORAGE') == 'db', 'FileStorage test')
+    def test_fs_begin_commit(self):
+        """Tests the begin and commit commands with the file storage.
+        """
+        with patch('sys.stdout', new=StringIO()) as cout:
+            cons = HBNBCommand()
+            cons.onecmd('begin')
+            cons.onecmd('create State name="Enugu"')
+            mdl_id = cout.getvalue().strip()
+            key = 'State.{}'.format(mdl_id)
+            self.assertIn(key, storage.all().keys())
+            saved = {}
+            if os.path.isfile('file.json'):
+                with open('file.json', 'r') as file:
+                    saved = json.load(file)
+            self.assertNotIn(key, saved)
+            cons.onecmd('commit')
+            with open('file.json', 'r') as file:
+                self.assertIn(key, json.load(file))
+
+    @unittest.skipIf(
+        os.getenv('HBNB_TYPE_STORAGE') == 'db', 'FileStorage test')
+    def test_fs_batch(self):
+        """Tests the console's batch mode with the file storage.
+        """
+        with patch('sys.stdout', new=StringIO()) as cout:
+            cons = HBNBCommand(batch_size=2)
+            cons.preloop()
+            clear_stream(cout)
+            cons.onecmd(cons.precmd('create State name="Enugu"'))
+            key = 'State.{}'.format(cout.getvalue().strip())
+            cons.postcmd(False, 'create State name="Enugu"')
+            saved = {}
+            if os.path.isfile('file.json'):
+                with open('file.json', 'r') as file:
+                    saved = json.load(file)
+            self.assertNotIn(key, saved)
+            cons.onecmd(cons.precmd('create State name="Abia"'))
+            cons.postcmd(False, 'create State name="Abia"')
+            with open('file.json', 'r') as file:
+                self.assertIn(key, json.load(file))
+            cons.onecmd('commit')
+            storage.commit()
+
     @unittest.skipIf(
         os.getenv('HBNB_TYPE_STORAGE') != 'db', 'DBStorage test')
     def test_db_create(self):
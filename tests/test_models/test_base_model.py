@@ -24,10 +24,11 @@ class TestBasemodel(unittest.TestCase):
 
     def tearDown(self):
         """Performs some operations after the tests are run"""
-        try:
-            os.remove('file.json')
-        except Exception:
-            pass
+        for path in ('file.json', 'file.json.lock'):
+            try:
+                os.remove(path)
+            except Exception:
+                pass
 
     def test_init(self):
         """Tests the initialization of the model class.
@@ -50,6 +51,63 @@ class TestBasemodel(unittest.TestCase):
         new = BaseModel(**copy)
         self.assertFalse(new is i)
 
+    def test_kwargs_keeps_id(self):
+        """Tests kwargs with a stored id and timestamps."""
+        i = self.value()
+        new = self.value(**i.to_dict())
+        self.assertEqual(new.id, i.id)
+        self.assertEqual(new.created_at, i.created_at)
+        self.assertEqual(new.updated_at, i.updated_at)
+
+    def test_from_dict(self):
+        """Tests rebuilding a model from its dictionary."""
+        i = self.value()
+        i.name = 'Lagos'
+        new = self.value.from_dict(i.to_dict())
+        self.assertFalse(new is i)
+        self.assertEqual(type(new), self.value)
+        self.assertEqual(new.to_dict(), i.to_dict())
+        self.assertEqual(type(new.created_at), datetime)
+
+    @unittest.skipIf(
+        os.getenv('HBNB_TYPE_STORAGE') == 'db', 'FileStorage test')
+    def test_changes(self):
+        """Tests the tracking of the attributes changed."""
+        i = self.value()
+        self.assertIn('id', i.changes())
+        self.assertIn(i, self.value.changed())
+        i.mark_stored()
+        self.assertEqual(i.changes(), frozenset())
+        i.name = 'Lagos'
+        self.assertEqual(i.changes(), {'name'})
+        new = self.value.from_dict(i.to_dict())
+        self.assertEqual(new.changes(), frozenset())
+
+    def test_cached_repr(self):
+        """Tests that cached representations follow attribute changes."""
+        i = self.value()
+        d = i.to_dict()
+        d['name'] = 'Lagos'
+        self.assertNotIn('name', i.to_dict())
+        self.assertIsNot(i.to_dict(), i.to_dict())
+        str(i)
+        i.name = 'Abuja'
+        self.assertEqual(i.to_dict()['name'], 'Abuja')
+        self.assertIn("'name': 'Abuja'", str(i))
+        del i.name
+        self.assertNotIn('name', i.to_dict())
+        self.assertNotIn('name', str(i))
+
+    def test_uncached_repr(self):
+        """Tests that uncached representations are not kept."""
+        from models.base_model import _cache
+        i = self.value()
+        self.assertEqual(i.to_str(False), str(i))
+        i.name = 'Abuja'
+        self.assertIn("'name': 'Abuja'", i.to_str(False))
+        i.to_dict(False)
+        self.assertNotIn(i, _cache)
+
     def test_kwargs_int(self):
         """Tests kwargs with an int."""
         i = self.value()
@@ -6,6 +6,10 @@ import unittest
 from datetime import datetime
 
 from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.state import State
 from models.user import User
 
 
@@ -180,3 +184,105 @@ class TestDBStorage(unittest.TestCase):
         self.assertEqual(new_count[0][0], old_count[0][0] + 1)
         cur.close()
         db.close()
+
+    def test_all_load(self):
+        """ Relationships passed to all() are loaded with the objects """
+        state = State(name='Lagos')
+        state.save()
+        city = City(name='Ikeja', state_id=state.id)
+        city.save()
+        storage.close()
+        storage.reload()
+        states = storage.all(State, load=('cities',))
+        loaded = states['State.{}'.format(state.id)]
+        self.assertIn('cities', loaded.__dict__)
+        self.assertEqual([c.id for c in loaded.cities], [city.id])
+
+    def test_get_and_count(self):
+        """ Objects are fetched and counted in the database """
+        old_count = storage.count(State)
+        state = State(name='Kano')
+        state.save()
+        self.assertEqual(storage.count(State), old_count + 1)
+        self.assertIs(storage.get(State, state.id), state)
+        self.assertIsNone(storage.get(State, 'missing'))
+        state.delete()
+        storage.save()
+        self.assertIsNone(storage.get(State, state.id))
+        self.assertEqual(storage.count(State), old_count)
+
+    def test_bulk_new(self):
+        """ Several objects are written to the database together """
+        old_count = storage.count(State)
+        states = [State(name='State {}'.format(i)) for i in range(10)]
+        storage.bulk_new(states)
+        storage.save()
+        self.assertEqual(storage.count(State), old_count + 10)
+
+    def test_all_page(self):
+        """ all() returns pages of models after a keyset cursor """
+        for name in ('Lagos', 'Abia', 'Enugu', 'Kano'):
+            storage.new(State(name=name))
+        storage.save()
+        ordered = list(storage.all(State, order_by='name').values())
+        names = [state.name for state in ordered]
+        self.assertEqual(names, sorted(names))
+        first = list(storage.all(State, limit=2, order_by='name').values())
+        self.assertEqual(first, ordered[:2])
+        rest = storage.all(State, after=first[-1].id, order_by='name')
+        self.assertEqual(list(rest.values()), ordered[2:])
+        by_id = list(storage.all(State, limit=3).values())
+        self.assertEqual([state.id for state in by_id],
+                         sorted(state.id for state in ordered)[:3])
+
+    def test_search_places(self):
+        """ search_places() filters places by location, amenities and
+        ranges and pages them by name """
+        owner = User(email='owner@mail.com', password='password')
+        lagos = State(name='Lagos')
+        ikeja = City(name='Ikeja', state=lagos)
+        kano = City(name='Kano', state=State(name='Kano'))
+        wifi = Amenity(name='Wifi')
+        for obj in (owner, ikeja, kano, wifi):
+            storage.new(obj)
+        storage.save()
+        places = {}
+        for name, city, price, guests in (
+                ('Villa', ikeja, 300, 8), ('Flat', ikeja, 80, 2),
+                ('Loft', ikeja, 120, 4), ('Hut', kano, 40, 2)):
+            places[name] = Place(name=name, city_id=city.id,
+                                 user_id=owner.id, price_by_night=price,
+                                 max_guest=guests)
+            storage.new(places[name])
+        places['Loft'].amenities.append(wifi)
+        places['Villa'].amenities.append(wifi)
+        storage.save()
+
+        def names(**filters):
+            return [place.name for place in
+                    storage.search_places(**filters).values()]
+        self.assertEqual(names(states=[lagos.id]), ['Flat', 'Loft', 'Villa'])
+        self.assertEqual(names(states=[lagos.id], cities=[kano.id]),
+                         ['Flat', 'Hut', 'Loft', 'Villa'])
+        self.assertEqual(names(amenities=[wifi.id]), ['Loft', 'Villa'])
+        self.assertEqual(names(cities=[ikeja.id, kano.id],
+                               price=(50, 200), guests=(2, None)),
+                         ['Flat', 'Loft'])
+        self.assertEqual(names(cities=[ikeja.id], limit=1,
+                               after=places['Flat'].id), ['Loft'])
+
+    def test_commit_unused(self):
+        """ Committing a storage never used does not connect """
+        from models.engine.db_storage import DBStorage
+        db = DBStorage()
+        db.begin()
+        db.commit()
+        self.assertIsNone(db._DBStorage__session)
+
+    def test_batch(self):
+        """ Saves inside a batch are committed when the batch ends """
+        old_count = storage.count(State)
+        with storage.batch():
+            for i in range(5):
+                State(name='State {}'.format(i)).save()
+        self.assertEqual(storage.count(State), old_count + 5)
@@ -1,10 +1,19 @@
 #!/usr/bin/python3
 """ Module for testing file storage"""
+import json
 import os
+import subprocess
+import sys
+import time
 import unittest
 
 from models import storage
+from models.amenity import Amenity
 from models.base_model import BaseModel
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
 
 
 @unittest.skipIf(
@@ -21,10 +30,18 @@ class TestFileStorage(unittest.TestCase):
 
     def tearDown(self):
         """ Remove storage file at end of tests """
-        try:
-            os.remove('file.json')
-        except Exception:
-            pass
+        storage.journal = False
+        storage.format = 'json'
+        storage.save_window = 0
+        storage.flush()
+        storage.shards = False
+        shards = [name + '.json' for name in storage.model_classes]
+        for path in ['file.json', 'file.json.log', 'file.json.lock',
+                     'file.bin'] + shards:
+            try:
+                os.remove(path)
+            except Exception:
+                pass
 
     def test_obj_list_empty(self):
         """ __objects is initially empty """
@@ -109,6 +126,481 @@ class TestFileStorage(unittest.TestCase):
                 temp = key
         self.assertEqual(temp, 'BaseModel' + '.' + _id)
 
+    def test_journal_append(self):
+        """ Saves in journal mode append to the log """
+        new = BaseModel()
+        new.save()
+        size = os.path.getsize('file.json')
+        storage.journal = True
+        new.name = 'journaled'
+        new.save()
+        other = BaseModel()
+        other.save()
+        self.assertEqual(os.path.getsize('file.json'), size)
+        with open('file.json.log', 'r') as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_journal_replay(self):
+        """ Journal records are applied on reload """
+        new = BaseModel()
+        new.save()
+        storage.journal = True
+        gone = BaseModel()
+        gone.save()
+        new.name = 'journaled'
+        new.save()
+        gone.delete()
+        storage.save()
+        del storage.all()['BaseModel.' + new.id]
+        storage.reload()
+        self.assertEqual(
+            storage.all()['BaseModel.' + new.id].name, 'journaled')
+        self.assertNotIn('BaseModel.' + gone.id, storage.all())
+
+    def test_journal_compact(self):
+        """ Compacting folds the journal into the snapshot """
+        new = BaseModel()
+        new.save()
+        storage.journal = True
+        new.name = 'journaled'
+        new.save()
+        storage.compact()
+        self.assertFalse(os.path.exists('file.json.log'))
+        with open('file.json', 'r') as f:
+            j = json.load(f)
+        self.assertEqual(j['BaseModel.' + new.id]['name'], 'journaled')
+
+    def test_save_reuses_records(self):
+        """ Records copied from the last write stay up to date """
+        first = State(name='A')
+        first.save()
+        second = State(name='B')
+        second.save()
+        first.name = 'C'
+        storage.save()
+        storage.delete(second)
+        third = State(name='D')
+        third.save()
+        with open('file.json', 'r') as f:
+            self.assertEqual(
+                json.load(f),
+                {key: obj.to_dict() for key, obj in storage.all().items()})
+
+    def test_journal_changed(self):
+        """ Changed objects are journaled without being passed to new() """
+        new = BaseModel()
+        new.save()
+        storage.journal = True
+        new.name = 'changed'
+        storage.save()
+        self.assertEqual(new.changes(), frozenset())
+        with open('file.json.log', 'r') as f:
+            record = json.loads(f.readline())
+        self.assertEqual(record['value']['name'], 'changed')
+
+    def test_all_page(self):
+        """ all() returns pages of models after a keyset cursor """
+        for name in ('Lagos', 'Abia', 'Enugu', 'Kano'):
+            State(name=name).save()
+        ordered = list(storage.all(State, order_by='name').values())
+        names = [state.name for state in ordered]
+        self.assertEqual(names, sorted(names))
+        first = list(storage.all(State, limit=2, order_by='name').values())
+        self.assertEqual(first, ordered[:2])
+        rest = storage.all(State, after=first[-1].id, order_by='name')
+        self.assertEqual(list(rest.values()), ordered[2:])
+        by_id = list(storage.all(State, limit=3).values())
+        self.assertEqual([state.id for state in by_id],
+                         sorted(state.id for state in ordered)[:3])
+
+    def test_search_places(self):
+        """ search_places() filters places by location, amenities and
+        ranges and pages them by name """
+        lagos = State(name='Lagos')
+        lagos.save()
+        ikeja = City(name='Ikeja', state_id=lagos.id)
+        ikeja.save()
+        kano = City(name='Kano', state_id='elsewhere')
+        kano.save()
+        wifi = Amenity(name='Wifi')
+        wifi.save()
+        places = {}
+        for name, city, price, guests in (
+                ('Villa', ikeja, 300, 8), ('Flat', ikeja, 80, 2),
+                ('Loft', ikeja, 120, 4), ('Hut', kano, 40, 2)):
+            place = Place(name=name, city_id=city.id, user_id='owner',
+                          price_by_night=price, max_guest=guests)
+            place.save()
+            places[name] = place
+        places['Loft'].amenities = wifi
+        places['Villa'].amenities = wifi
+
+        def names(**filters):
+            return [place.name for place in
+                    storage.search_places(**filters).values()]
+        self.assertEqual(names(), ['Flat', 'Hut', 'Loft', 'Villa'])
+        self.assertEqual(names(states=[lagos.id]), ['Flat', 'Loft', 'Villa'])
+        self.assertEqual(names(states=[lagos.id], cities=[kano.id]),
+                         ['Flat', 'Hut', 'Loft', 'Villa'])
+        self.assertEqual(names(amenities=[wifi.id]), ['Loft', 'Villa'])
+        self.assertEqual(names(price=(50, 200), guests=(2, None)),
+                         ['Flat', 'Loft'])
+        self.assertEqual(names(cities=[ikeja.id], limit=1,
+                               after=places['Flat'].id), ['Loft'])
+        self.assertEqual(names(limit=2, after=places['Hut'].id),
+                         ['Loft', 'Villa'])
+
+    def test_all_order_updates(self):
+        """ The sorted view follows adds, deletes and name changes """
+        kano = State(name='Kano')
+        kano.save()
+        State(name='Abia').save()
+        storage.all(State, order_by='name')
+        lagos = State(name='Lagos')
+        lagos.save()
+        kano.name = 'Zamfara'
+        storage.delete(lagos)
+        self.assertEqual(
+            [state.name for state in
+             storage.all(State, order_by='name').values()],
+            ['Abia', 'Zamfara'])
+
+    def test_close_unchanged(self):
+        """ Closing does not rebuild objects when the file is unchanged """
+        new = BaseModel()
+        new.save()
+        key = 'BaseModel.' + new.id
+        storage.close()
+        self.assertIs(storage.all()[key], new)
+
+    def test_close_changed(self):
+        """ Closing picks up changes made by another writer """
+        new = BaseModel()
+        new.save()
+        key = 'BaseModel.' + new.id
+        with open('file.json', 'r') as f:
+            j = json.load(f)
+        j[key]['name'] = 'changed'
+        with open('file.json', 'w') as f:
+            json.dump(j, f)
+        storage.close()
+        self.assertEqual(storage.all()[key].name, 'changed')
+
+    def test_all_cls(self):
+        """ all() with a class returns only the objects of that class """
+        new = BaseModel()
+        new.save()
+        user = User()
+        user.save()
+        self.assertEqual(list(storage.all(User).values()), [user])
+        del storage.all()['User.' + user.id]
+        self.assertEqual(storage.all(User), {})
+        self.assertIn('BaseModel.' + new.id, storage.all(BaseModel))
+
+    def test_iter(self):
+        """ iter() yields the stored objects of a class """
+        new = BaseModel()
+        new.save()
+        user = User()
+        user.save()
+        self.assertEqual(list(storage.iter(User)), [user])
+        self.assertEqual(len(list(storage.iter())), 2)
+
+    def test_get(self):
+        """ get() returns the object of a class with an id """
+        user = User()
+        user.save()
+        self.assertIs(storage.get(User, user.id), user)
+        self.assertIsNone(storage.get(BaseModel, user.id))
+        self.assertIsNone(storage.get(User, 'missing'))
+
+    def test_count(self):
+        """ count() returns the number of objects of a class """
+        BaseModel().save()
+        User().save()
+        User().save()
+        self.assertEqual(storage.count(User), 2)
+        self.assertEqual(storage.count(City), 0)
+        self.assertEqual(storage.count(), 3)
+
+    def test_bulk_new(self):
+        """ bulk_new() adds every object """
+        users = [User(), User()]
+        storage.bulk_new(users)
+        self.assertEqual(list(storage.iter(User)), users)
+
+    def test_lookup(self):
+        """ Objects are found by an indexed attribute's value """
+        storage.register_index(City, 'state_id')
+        city = City()
+        city.state_id = 'a'
+        city.save()
+        other = City()
+        other.state_id = 'b'
+        other.save()
+        key = 'City.' + city.id
+        self.assertEqual(list(storage.lookup(City, 'state_id', 'a')), [key])
+        city.state_id = 'b'
+        city.save()
+        self.assertEqual(storage.lookup(City, 'state_id', 'a'), {})
+        self.assertEqual(len(storage.lookup(City, 'state_id', 'b')), 2)
+        city.delete()
+        self.assertNotIn(key, storage.lookup(City, 'state_id', 'b'))
+
+    def test_lookup_ordered(self):
+        """ lookup() sorts the matches from an index kept in order """
+        lagos = State(name='Lagos')
+        lagos.save()
+        ikeja = City(name='Ikeja', state_id=lagos.id)
+        ikeja.save()
+        City(name='Badagry', state_id=lagos.id).save()
+        City(name='Abuja', state_id='elsewhere').save()
+        self.assertEqual([city.name for city in lagos.cities],
+                         ['Badagry', 'Ikeja'])
+        epe = City(name='Epe', state_id=lagos.id)
+        epe.save()
+        ikeja.name = 'Apapa'
+        self.assertEqual([city.name for city in lagos.cities],
+                         ['Apapa', 'Badagry', 'Epe'])
+        ikeja.state_id = 'elsewhere'
+        storage.delete(epe)
+        self.assertEqual([city.name for city in lagos.cities], ['Badagry'])
+
+    def test_binary_format(self):
+        """ Objects round-trip through the binary snapshot format """
+        storage.format = 'binary'
+        user = User()
+        user.name = 'binary'
+        user.save()
+        city = City()
+        city.save()
+        self.assertTrue(os.path.exists('file.bin'))
+        storage.reload()
+        self.assertEqual(
+            storage._FileStorage__unloaded, {'User', 'City'})
+        self.assertEqual(storage.get(User, user.id).name, 'binary')
+        self.assertIn('City', storage._FileStorage__unloaded)
+        self.assertEqual(list(storage.all(City)), ['City.' + city.id])
+        self.assertEqual(len(storage.all()), 2)
+
+    def test_count_unloaded(self):
+        """ count() counts the models not loaded yet """
+        for fmt, shards in (('binary', False), ('json', True)):
+            storage.format = fmt
+            storage.shards = shards
+            State().save()
+            User().save()
+            storage.reload()
+            self.assertEqual(storage.count(), 2)
+            self.assertEqual(storage.count(State), 1)
+            if fmt == 'binary':
+                self.assertIn('State', storage._FileStorage__unloaded)
+            storage.new(State())
+            self.assertEqual(storage.count(State), 2)
+            self.assertEqual(storage.count(), 3)
+            for key in list(storage.all().keys()):
+                del storage.all()[key]
+            storage.save()
+
+    def test_format_migration(self):
+        """ Switching formats loads file.json and writes it anew """
+        for fmt, shards in (('binary', False), ('json', True)):
+            storage.format = 'json'
+            storage.shards = False
+            state = State()
+            state.save()
+            storage.format = fmt
+            storage.shards = shards
+            storage.reload()
+            self.assertIn('State.' + state.id, storage.all(State))
+            user = User()
+            user.save()
+            storage.reload()
+            self.assertEqual(
+                set(storage.all()), {'State.' + state.id, 'User.' + user.id})
+            for key in list(storage.all().keys()):
+                del storage.all()[key]
+            for path in ('file.json', 'file.bin', 'State.json', 'User.json'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def test_binary_delete_unloaded(self):
+        """ Deleted objects aren't loaded back from a binary snapshot """
+        storage.format = 'binary'
+        user = User()
+        user.save()
+        other = User()
+        other.save()
+        storage.reload()
+        storage.delete(storage.get(User, user.id))
+        self.assertEqual(list(storage.all(User)), ['User.' + other.id])
+
+    def test_binary_other_process_changed(self):
+        """ Binary refreshes keep the models changed with setattr """
+        storage.format = 'binary'
+        state = State(name='A')
+        state.save()
+        subprocess.run(
+            [sys.executable, '-c',
+             'from models import storage; from models.user import User; '
+             'storage.format = "binary"; User().save()'], check=True)
+        state.name = 'B'
+        storage.save()
+        self.assertIs(storage.get(State, state.id), state)
+        self.assertEqual(len(storage.all(User)), 1)
+        storage.reload()
+        self.assertEqual(storage.get(State, state.id).name, 'B')
+
+    def test_save_atomic(self):
+        """ Saving leaves no temporary file behind """
+        BaseModel().save()
+        self.assertEqual(
+            [f for f in os.listdir('.') if f.endswith('.tmp')], [])
+        with open('file.json', 'r') as f:
+            self.assertEqual(len(json.load(f)), 1)
+
+    def test_save_window(self):
+        """ Saves within the save window are written together """
+        storage.save_window = 60000
+        first = BaseModel()
+        first.save()
+        second = BaseModel()
+        second.save()
+        self.assertFalse(os.path.exists('file.json'))
+        storage.flush()
+        with open('file.json', 'r') as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    def test_save_window_ends(self):
+        """ The first save after the save window writes the others """
+        storage.save_window = 1
+        BaseModel().save()
+        self.assertFalse(os.path.exists('file.json'))
+        time.sleep(0.01)
+        BaseModel().save()
+        with open('file.json', 'r') as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    def test_other_process(self):
+        """ Saves from other processes are picked up and kept """
+        first = BaseModel()
+        first.save()
+        other = subprocess.run(
+            [sys.executable, '-c',
+             'from models.user import User; u = User(); u.save(); '
+             'print(u.id)'],
+            stdout=subprocess.PIPE, universal_newlines=True, check=True)
+        key = 'User.' + other.stdout.strip()
+        storage.close()
+        self.assertIn(key, storage.all())
+        second = BaseModel()
+        second.save()
+        with open('file.json', 'r') as f:
+            j = json.load(f)
+        self.assertIn(key, j)
+        self.assertIn('BaseModel.' + first.id, j)
+        self.assertIn('BaseModel.' + second.id, j)
+
+    def test_shards(self):
+        """ Sharded storage rewrites and loads one class at a time """
+        storage.shards = True
+        user = User()
+        user.save()
+        city = City()
+        city.save()
+        self.assertFalse(os.path.exists('file.json'))
+        city_stat = os.stat('City.json')
+        User().save()
+        self.assertEqual(os.stat('City.json').st_ino, city_stat.st_ino)
+        with open('User.json', 'r') as f:
+            self.assertEqual(len(json.load(f)), 2)
+        storage.reload()
+        self.assertEqual(storage._FileStorage__unloaded, {'User', 'City'})
+        self.assertEqual(len(storage.all(User)), 2)
+        self.assertEqual(storage._FileStorage__unloaded, {'City'})
+        self.assertEqual(storage.get(City, city.id).id, city.id)
+
+    def test_shards_reload_pending(self):
+        """ Reloading sharded storage keeps the models not saved yet """
+        storage.shards = True
+        User().save()
+        new = User()
+        storage.new(new)
+        storage.reload()
+        storage.save()
+        storage.reload()
+        self.assertIn('User.' + new.id, storage.all(User))
+        self.assertEqual(storage.count(User), 2)
+
+    def test_shards_journal_compact(self):
+        """ Compacting a sharded journal keeps the changes it held """
+        storage.shards = True
+        storage.journal = True
+        state = State(name='A')
+        state.save()
+        City().save()
+        state.name = 'B'
+        storage.save()
+        storage.compact()
+        self.assertFalse(os.path.exists('file.json.log'))
+        other = subprocess.run(
+            [sys.executable, '-c',
+             'from models import storage; from models.state import State; '
+             'storage.shards = True; '
+             'print([s.name for s in storage.all(State).values()])'],
+            stdout=subprocess.PIPE, universal_newlines=True, check=True)
+        self.assertEqual(other.stdout.strip(), "['B']")
+
+    def test_generation(self):
+        """ The generation changes whenever the models change """
+        generation = storage.generation
+        self.assertEqual(storage.generation, generation)
+        new = BaseModel()
+        new.save()
+        self.assertNotEqual(storage.generation, generation)
+        generation = storage.generation
+        storage.delete(new)
+        self.assertNotEqual(storage.generation, generation)
+
+    def test_fingerprint(self):
+        """ Processes reading the same files share the fingerprint """
+        for fmt, shards in (('json', False), ('binary', False),
+                            ('json', True)):
+            storage.format = fmt
+            storage.shards = shards
+            state = State()
+            state.save()
+            User().save()
+            fingerprint = storage.fingerprint
+            other = subprocess.run(
+                [sys.executable, '-c',
+                 'from models import storage; from models.state import '
+                 'State; storage.format = "{}"; storage.shards = {}; '
+                 'storage.count(State); print(storage.fingerprint)'.format(
+                     fmt, shards)],
+                stdout=subprocess.PIPE, universal_newlines=True, check=True)
+            self.assertEqual(other.stdout.strip(), fingerprint)
+            storage.delete(state)
+            self.assertNotEqual(storage.fingerprint, fingerprint)
+            storage.save()
+            self.assertNotEqual(storage.fingerprint, fingerprint)
+
+    def test_last_modified(self):
+        """ last_modified follows the latest update """
+        new = BaseModel()
+        new.save()
+        self.assertEqual(storage.last_modified, new.updated_at)
+        storage.delete(new)
+        self.assertGreaterEqual(storage.last_modified, new.updated_at)
+
+    def test_lazy_load(self):
+        """ FileStorage loads its file when it is first used """
+        from models.engine.file_storage import FileStorage
+        fs = FileStorage()
+        self.assertFalse(fs._FileStorage__loaded)
+        fs.count()
+        self.assertTrue(fs._FileStorage__loaded)
+
     def test_storage_var_created(self):
         """ FileStorage object storage created """
         from models.engine.file_storage import FileStorage
@@ -1,9 +1,12 @@
 #!/usr/bin/python3
 """ """
 import os
+import unittest
 
 from tests.test_models.test_base_model import TestBasemodel
+from models.amenity import Amenity
 from models.place import Place
+from models.review import Review
 
 
 class TestPlace(TestBasemodel):
@@ -98,3 +101,33 @@ class TestPlace(TestBasemodel):
         """Tests the type of amenity_ids."""
         new = self.value()
         self.assertEqual(type(new.amenity_ids), list)
+
+    @unittest.skipIf(
+        os.getenv('HBNB_TYPE_STORAGE') == 'db', 'FileStorage test')
+    def test_amenities(self):
+        """Tests the amenities of a Place in the file storage."""
+        place = self.value()
+        other = self.value()
+        amenity = Amenity()
+        amenity.save()
+        place.amenities = amenity
+        place.amenities = amenity
+        self.assertEqual(place.amenity_ids, [amenity.id])
+        self.assertEqual(other.amenity_ids, [])
+        self.assertEqual(place.amenities, [amenity])
+        self.assertEqual(other.amenities, [])
+        place.amenity_ids = []
+        place.amenities = amenity
+        place.amenities = amenity
+        self.assertEqual(place.amenity_ids, [amenity.id])
+
+    @unittest.skipIf(
+        os.getenv('HBNB_TYPE_STORAGE') == 'db', 'FileStorage test')
+    def test_reviews(self):
+        """Tests the reviews of a Place in the file storage."""
+        place = self.value()
+        place.save()
+        review = Review(place_id=place.id)
+        review.save()
+        Review().save()
+        self.assertEqual(place.reviews, [review])
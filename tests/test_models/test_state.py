@@ -1,8 +1,10 @@
 #!/usr/bin/python3
 """ """
 import os
+import unittest
 
 from tests.test_models.test_base_model import TestBasemodel
+from models.city import City
 from models.state import State
 
 
@@ -21,3 +23,17 @@ class TestState(TestBasemodel):
             type(new.name),
             str if os.getenv('HBNB_TYPE_STORAGE') != 'db' else type(None)
         )
+
+    @unittest.skipIf(
+        os.getenv('HBNB_TYPE_STORAGE') == 'db', 'FileStorage test')
+    def test_cities(self):
+        """Tests the cities of a State in the file storage."""
+        state = self.value()
+        state.save()
+        city = City(state_id=state.id)
+        city.save()
+        other = City()
+        other.save()
+        self.assertEqual(state.cities, [city])
+        city.delete()
+        self.assertEqual(state.cities, [])
@@ -0,0 +1,3 @@
+#!/usr/bin/python3
+"""Tests for the web_flask applications.
+"""
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""A unit test module for the cache of the web_flask pages.
+"""
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from models.state import State
+from tests import delete_file
+from web_flask import page_cache
+
+
+class TestPageCache(unittest.TestCase):
+    """Represents the test class for the cached decorator.
+    """
+    def setUp(self):
+        """Sets up an application with one cached page.
+        """
+        self.renders = 0
+        app = Flask(__name__)
+
+        @app.route('/page')
+        @page_cache.cached
+        def page():
+            self.renders += 1
+            return 'page {}'.format(self.renders)
+        self.client = app.test_client()
+        page_cache._pages.clear()
+
+    def tearDown(self):
+        """Removes the storage files.
+        """
+        page_cache._pages.clear()
+        for path in ('file.json', 'file.json.lock'):
+            delete_file(path)
+
+    @patch.object(page_cache, 'TTL', 60)
+    def test_cached(self):
+        """Tests that pages are rendered again once the storage changes.
+        """
+        first = self.client.get('/page')
+        self.assertEqual(self.client.get('/page').data, first.data)
+        self.assertEqual(self.renders, 1)
+        State(name='Lagos').save()
+        second = self.client.get('/page')
+        self.assertEqual(self.renders, 2)
+        self.assertNotEqual(second.get_etag(), first.get_etag())
+
+    @patch.object(page_cache, 'TTL', 60)
+    def test_not_modified(self):
+        """Tests that conditional requests get 304 without a render.
+        """
+        etag = self.client.get('/page').get_etag()[0]
+        page_cache._pages.clear()
+        response = self.client.get(
+            '/page', headers={'If-None-Match': '"{}"'.format(etag)})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.renders, 1)
+        State(name='Lagos').save()
+        response = self.client.get(
+            '/page', headers={'If-None-Match': '"{}"'.format(etag)})
+        self.assertEqual(response.status_code, 200)
+
+    @patch.object(page_cache, 'TTL', 0)
+    def test_not_modified_uncached(self):
+        """Tests that conditional requests skip the render without a cache.
+        """
+        etag = self.client.get('/page').get_etag()[0]
+        response = self.client.get(
+            '/page', headers={'If-None-Match': '"{}"'.format(etag)})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.renders, 1)
+        self.assertEqual(page_cache._pages, {})
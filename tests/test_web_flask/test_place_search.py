@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+"""A unit test module for the place search of the web_flask pages.
+"""
+import os
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from tests import delete_file
+from web_flask import place_search
+
+
+@unittest.skipIf(
+    os.getenv('HBNB_TYPE_STORAGE') == 'db', 'FileStorage test')
+class TestPlaceSearch(unittest.TestCase):
+    """Represents the test class for the places_search view.
+    """
+    def setUp(self):
+        """Sets up an application offering the search and some places.
+        """
+        for key in list(storage.all().keys()):
+            del storage.all()[key]
+        app = Flask(__name__)
+        app.register_blueprint(place_search.place_search)
+        self.client = app.test_client()
+        self.city = City(name='Ikeja', state_id='lagos')
+        self.city.save()
+        self.wifi = Amenity(name='Wifi')
+        self.wifi.save()
+        for i in range(5):
+            place = Place(name='Place {}'.format(i), city_id=self.city.id,
+                          price_by_night=i * 50, max_guest=i)
+            if i % 2 == 0:
+                place.amenities = self.wifi
+            place.save()
+
+    def tearDown(self):
+        """Removes the storage files.
+        """
+        for path in ('file.json', 'file.json.lock'):
+            delete_file(path)
+
+    def search(self, **filters):
+        """Returns the names of the places found and the next cursor.
+        """
+        response = self.client.post('/places_search', json=filters)
+        self.assertEqual(response.status_code, 200)
+        result = response.get_json()
+        return [place['name'] for place in result['places']], result['next']
+
+    def test_filters(self):
+        """Tests that the places are filtered and sorted by name.
+        """
+        self.assertEqual(len(self.search()[0]), 5)
+        self.assertEqual(
+            self.search(cities=[self.city.id], amenities=[self.wifi.id],
+                        price_min=50, guests_max=4),
+            (['Place 2', 'Place 4'], None))
+        self.assertEqual(self.search(states=['nowhere']), ([], None))
+
+    def test_pages(self):
+        """Tests that the next cursor leads to the following page.
+        """
+        names, after = self.search(limit=2)
+        self.assertEqual(names, ['Place 0', 'Place 1'])
+        names, after = self.search(limit=2, after=after)
+        self.assertEqual(names, ['Place 2', 'Place 3'])
+        self.assertEqual(self.search(limit=2, after=after),
+                         (['Place 4'], None))
+
+    def test_limit(self):
+        """Tests that the limit is clamped.
+        """
+        self.assertEqual(len(self.search(limit=0)[0]), 1)
+        with patch.object(place_search, 'MAX_LIMIT', 3):
+            self.assertEqual(len(self.search(limit=50)[0]), 3)
+        with patch.object(place_search, 'LIMIT', 4):
+            self.assertEqual(len(self.search()[0]), 4)
+
+    def test_bad_request(self):
+        """Tests that malformed searches are rejected.
+        """
+        response = self.client.post('/places_search', data='states')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {'error': 'Not a JSON'})
+        for filters in ([], {'states': 'lagos'}, {'cities': [1]},
+                        {'price_min': '10'}, {'guests_max': True},
+                        {'limit': 1.5}, {'after': 3}):
+            response = self.client.post('/places_search', json=filters)
+            self.assertEqual(response.status_code, 400, filters)
+            self.assertIn('error', response.get_json())
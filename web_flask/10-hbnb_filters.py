@@ -6,22 +6,23 @@ from flask import Flask, render_template
 from models import storage
 from models.amenity import Amenity
 from models.state import State
+from web_flask.page_cache import cached
+from web_flask.place_search import place_search
 
 
 app = Flask(__name__)
 '''The Flask application instance.'''
 app.url_map.strict_slashes = False
+app.register_blueprint(place_search)
 
 
 @app.route('/hbnb_filters')
+@cached
 def hbnb_filters():
     '''The hbnb_filters page.'''
-    all_states = list(storage.all(State).values())
-    amenities = list(storage.all(Amenity).values())
-    all_states.sort(key=lambda x: x.name)
-    amenities.sort(key=lambda x: x.name)
-    for state in all_states:
-        state.cities.sort(key=lambda x: x.name)
+    all_states = list(storage.all(
+        State, load=('cities',), order_by='name').values())
+    amenities = list(storage.all(Amenity, order_by='name').values())
     ctxt = {
         'states': all_states,
         'amenities': amenities
@@ -1,36 +1,40 @@
 #!/usr/bin/python3
 '''A simple Flask web application.
 '''
-from flask import Flask, render_template, Markup
+from flask import Flask, render_template, request
 
 from models import storage
 from models.amenity import Amenity
 from models.place import Place
 from models.state import State
+from web_flask.page_cache import cached
+from web_flask.place_search import place_search
 
 
 app = Flask(__name__)
 '''The Flask application instance.'''
 app.url_map.strict_slashes = False
+app.register_blueprint(place_search)
+PAGE_SIZE = 20
+'''The number of places shown on a page.'''
 
 
 @app.route('/hbnb')
+@cached
 def hbnb():
     '''The hbnb page.'''
-    all_states = list(storage.all(State).values())
-    amenities = list(storage.all(Amenity).values())
-    places = list(storage.all(Place).values())
-    all_states.sort(key=lambda x: x.name)
-    amenities.sort(key=lambda x: x.name)
-    places.sort(key=lambda x: x.name)
-    for state in all_states:
-        state.cities.sort(key=lambda x: x.name)
-    for place in places:
-        place.description = Markup(place.description)
+    all_states = list(storage.all(
+        State, load=('cities',), order_by='name').values())
+    amenities = list(storage.all(Amenity, order_by='name').values())
+    places = list(storage.all(
+        Place, load=('user',), limit=PAGE_SIZE,
+        after=request.args.get('after'), order_by='name'
+    ).values())
     ctxt = {
         'states': all_states,
         'amenities': amenities,
-        'places': places
+        'places': places,
+        'next_page': places[-1].id if len(places) == PAGE_SIZE else None
     }
     return render_template('100-hbnb.html', **ctxt)
 
@@ -5,6 +5,7 @@ from flask import Flask, render_template
 
 from models import storage
 from models.state import State
+from web_flask.page_cache import cached
 
 
 app = Flask(__name__)
@@ -13,10 +14,10 @@ app.url_map.strict_slashes = False
 
 
 @app.route('/states_list')
+@cached
 def states_list():
     '''The states_list page.'''
-    all_states = list(storage.all(State).values())
-    all_states.sort(key=lambda x: x.name)
+    all_states = list(storage.all(State, order_by='name').values())
     ctxt = {
         'states': all_states
     }
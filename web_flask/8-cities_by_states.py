@@ -5,6 +5,7 @@ from flask import Flask, render_template
 
 from models import storage
 from models.state import State
+from web_flask.page_cache import cached
 
 
 app = Flask(__name__)
@@ -13,12 +14,11 @@ app.url_map.strict_slashes = False
 
 
 @app.route('/cities_by_states')
+@cached
 def cities_by_states():
     '''The cities_by_states page.'''
-    all_states = list(storage.all(State).values())
-    all_states.sort(key=lambda x: x.name)
-    for state in all_states:
-        state.cities.sort(key=lambda x: x.name)
+    all_states = list(storage.all(
+        State, load=('cities',), order_by='name').values())
     ctxt = {
         'states': all_states
     }
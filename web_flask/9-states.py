@@ -5,6 +5,7 @@ from flask import Flask, render_template
 
 from models import storage
 from models.state import State
+from web_flask.page_cache import cached
 
 
 app = Flask(__name__)
@@ -14,23 +15,20 @@ app.url_map.strict_slashes = False
 
 @app.route('/states')
 @app.route('/states/<id>')
+@cached
 def states(id=None):
     '''The states page.'''
     states = None
     state = None
-    all_states = list(storage.all(State).values())
     case = 404
     if id is not None:
-        res = list(filter(lambda x: x.id == id, all_states))
-        if len(res) > 0:
-            state = res[0]
-            state.cities.sort(key=lambda x: x.name)
+        # its cities are loaded through the state_id index when rendered
+        state = storage.get(State, id)
+        if state is not None:
             case = 2
     else:
-        states = all_states
-        for state in states:
-            state.cities.sort(key=lambda x: x.name)
-        states.sort(key=lambda x: x.name)
+        states = list(storage.all(
+            State, load=('cities',), order_by='name').values())
         case = 1
     ctxt = {
         'states': states,
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+'''A cache of the pages rendered from the models in storage.
+A page is served from the cache until the storage changes or, since
+changes made by other processes to the database aren't seen, until
+it gets older than HBNB_PAGE_CACHE_TTL seconds. Pages carry a strong
+ETag, derived from the request and the state of the storage rather
+than from the page, so that conditional requests for an unchanged page
+are answered with 304 Not Modified without rendering it.
+'''
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+from functools import wraps
+
+from flask import make_response, request
+
+from models import storage
+
+
+MAX_PAGES = 256
+'''The number of pages kept in the cache.'''
+TTL = float(os.getenv('HBNB_PAGE_CACHE_TTL', '60'))
+'''The number of seconds a page is served from the cache at most,
+or 0 to disable the cache.'''
+_pages = OrderedDict()
+_lock = threading.Lock()
+
+
+def cached(view):
+    '''Caches the pages returned by a view, keyed by the path and the
+    query string of their request, and answers the conditional requests
+    for them.
+
+    Args:
+        view (function): A view returning the text of its page.
+    '''
+    @wraps(view)
+    def cached_view(*args, **kwargs):
+        '''Returns the cached page or renders and caches it.'''
+        key = (request.path, request.query_string)
+        generation = storage.generation
+        now = time.monotonic()
+        entry = None
+        if TTL > 0:
+            with _lock:
+                entry = _pages.get(key)
+                if entry is not None and entry[0] == generation and \
+                        now < entry[1]:
+                    _pages.move_to_end(key)
+                else:
+                    entry = None
+        if entry is None:
+            last_modified = storage.last_modified
+            etag = _etag(key)
+            if request.if_none_match.contains_weak(etag):
+                return _response('', 304, etag, last_modified)
+            page = view(*args, **kwargs)
+            entry = (generation, now + TTL, page, etag, last_modified)
+            if TTL > 0:
+                with _lock:
+                    _pages[key] = entry
+                    _pages.move_to_end(key)
+                    while len(_pages) > MAX_PAGES:
+                        _pages.popitem(last=False)
+        if request.if_none_match.contains_weak(entry[3]):
+            return _response('', 304, entry[3], entry[4])
+        return _response(entry[2], 200, entry[3], entry[4])
+    return cached_view
+
+
+def _etag(key):
+    '''Returns the ETag of a page, the same in every process for as long
+    as the models in storage stay the same.
+
+    Args:
+        key (tuple): The path and the query string of the page.
+    '''
+    state = repr((key, storage.fingerprint))
+    return hashlib.sha1(state.encode()).hexdigest()
+
+
+def _response(page, status, etag, last_modified):
+    '''Builds the response for a page.
+    Last-Modified is informational: a delete made by another process
+    may leave it unchanged, so conditional requests are only answered
+    from the ETag.
+    '''
+    response = make_response(page, status)
+    response.set_etag(etag)
+    if last_modified is not None:
+        # naive datetimes are in local time
+        response.last_modified = last_modified.astimezone(timezone.utc)
+    return response
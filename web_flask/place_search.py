@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+'''The place search behind the Search button of the hbnb pages.
+It answers POST /places_search with a JSON object of filters:
+    states, cities, amenities: lists of ids
+    price_min, price_max, guests_min, guests_max: integers
+    limit: the number of places returned, at most MAX_LIMIT
+    after: the id of the last place of the previous page
+with {"places": [...], "next": <the after of the next page or null>}.
+The places are sorted by name.
+'''
+from flask import Blueprint, jsonify, request
+
+from models import storage
+
+
+LIMIT = 20
+'''The number of places returned when the search sets no limit.'''
+MAX_LIMIT = 100
+'''The number of places returned at most.'''
+place_search = Blueprint('place_search', __name__)
+'''The blueprint registered by the applications offering the search.'''
+
+
+def _ids(filters, name):
+    '''Returns a list of ids of a search or raises ValueError.'''
+    ids = filters.get(name) or []
+    if type(ids) is not list or \
+            any(type(value) is not str for value in ids):
+        raise ValueError('{} must be a list of ids'.format(name))
+    return ids
+
+
+def _number(filters, name):
+    '''Returns an integer of a search, or None, or raises ValueError.'''
+    value = filters.get(name)
+    if value is not None and \
+            (type(value) is not int or isinstance(value, bool)):
+        raise ValueError('{} must be an integer'.format(name))
+    return value
+
+
+@place_search.route('/places_search', methods=['POST'])
+def places_search():
+    '''Returns a page of the places matching the filters of a search.'''
+    filters = request.get_json(silent=True)
+    if type(filters) is not dict:
+        return jsonify(error='Not a JSON'), 400
+    try:
+        limit = _number(filters, 'limit')
+        limit = LIMIT if limit is None else min(max(limit, 1), MAX_LIMIT)
+        after = filters.get('after')
+        if after is not None and type(after) is not str:
+            raise ValueError('after must be an id')
+        places = list(storage.search_places(
+            states=_ids(filters, 'states'),
+            cities=_ids(filters, 'cities'),
+            amenities=_ids(filters, 'amenities'),
+            price=(_number(filters, 'price_min'),
+                   _number(filters, 'price_max')),
+            guests=(_number(filters, 'guests_min'),
+                    _number(filters, 'guests_max')),
+            limit=limit, after=after
+        ).values())
+    except ValueError as ex:
+        return jsonify(error=str(ex)), 400
+    return jsonify(
+        places=[place.to_dict() for place in places],
+        next=places[-1].id if len(places) == limit else None
+    )